@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: fast-path HTML extraction vs BeautifulSoup on saved AoC pages
+
+Uses the pages saved by the HTTP cache (.cache/aoc/http) unless HTML files
+are given on the command line. Every page is parsed both ways and the
+results must match byte for byte.
+
+    uv run python scripts/bench_extract.py [page.html ...] [--rounds 50]
+"""
+
+import argparse
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.aoc_client import AoCClient, parse_calendar_days, parse_puzzle_page  # noqa: E402
+from src.cache import CacheStore  # noqa: E402
+
+
+def load_pages(paths: list[str]) -> list[tuple[str, str]]:
+    """Return (name, html) pairs from the given files or the HTTP cache."""
+    if paths:
+        return [(path, Path(path).read_text()) for path in paths]
+
+    pages = []
+    for entry in sorted((AoCClient.CACHE_DIR / "http").glob("**/*.cache")):
+        data = CacheStore(entry.parent).get_json(entry.stem)
+        if data:
+            pages.append((data["url"], data["body"]))
+    return pages
+
+
+def timed(fn, body: str, rounds: int) -> tuple[object, float]:
+    """Run fn(body) `rounds` times. Returns (result, mean seconds)."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn(body)
+    return result, (time.perf_counter() - start) / rounds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("pages", nargs="*", help="HTML files (default: saved AoC pages)")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages)
+    if not pages:
+        print("No pages found - fetch some puzzles first or pass HTML files")
+        return 1
+
+    total_fast = total_slow = 0.0
+    mismatches = 0
+    print(f"{'page':<50} {'bs4 ms':>9} {'fast ms':>9} {'speedup':>8}  identical")
+    for name, body in pages:
+        parse = partial(parse_puzzle_page, year=2025) if "day-desc" in body else parse_calendar_days
+        fast_fn, slow_fn = partial(parse, fast_extract=True), partial(parse, fast_extract=False)
+        slow_result, slow_time = timed(slow_fn, body, args.rounds)
+        fast_result, fast_time = timed(fast_fn, body, args.rounds)
+        identical = fast_result == slow_result
+        mismatches += not identical
+        total_fast += fast_time
+        total_slow += slow_time
+        print(
+            f"{name[-50:]:<50} {slow_time * 1000:>9.3f} {fast_time * 1000:>9.3f} "
+            f"{slow_time / fast_time:>7.1f}x  {'yes' if identical else 'NO'}"
+        )
+
+    print(f"\nTotal: bs4 {total_slow * 1000:.3f} ms, fast {total_fast * 1000:.3f} ms, "
+          f"speedup {total_slow / total_fast:.1f}x over {len(pages)} pages")
+    if mismatches:
+        print(f"{mismatches} page(s) produced different output")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ScenarioGenerator parsing, schema validation and end-to-end throughput
+
+Runs over recorded responses (see src/replay.py; record with
+`python -m src.main --record fixtures/generator`). Without a fixture
+directory a synthetic corpus of stand-in scenarios is used, so the
+benchmark always runs without an API key.
+
+    uv run python scripts/bench_generator.py [--fixtures DIR] [--rounds 20] [--latency 0]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from anthropic.types import Message  # noqa: E402
+
+from src.aoc_client import AoCPuzzle  # noqa: E402
+from src.api_standin import StandinAPI, standin_scenario  # noqa: E402
+from src.replay import ReplayClient, load_fixtures  # noqa: E402
+from src.scenario_gen import ScenarioGenerator  # noqa: E402
+from src.schema import validate_scenario  # noqa: E402
+
+
+def synthetic_fixtures(directory: Path, days: int) -> None:
+    """Write stand-in responses (one per day) as fixtures."""
+    api = StandinAPI()
+    for day in range(1, days + 1):
+        message = api.message({"model": ScenarioGenerator.MODEL}, text=json.dumps(standin_scenario(day), indent=2))
+        fixture = {"key": f"synthetic-{day}", "recorded_at": day, "latency": 0.0, "response": message}
+        (directory / f"synthetic-{day:02d}.json").write_text(json.dumps(fixture))
+
+
+def timed(fn, rounds: int) -> list[float]:
+    """Per-call seconds for `rounds` calls of fn()."""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(name: str, samples: list[float]) -> None:
+    print(
+        f"{name:<22} mean {statistics.mean(samples) * 1000:8.3f} ms   "
+        f"p50 {statistics.median(samples) * 1000:8.3f} ms   "
+        f"max {max(samples) * 1000:8.3f} ms"
+    )
+
+
+def puzzle_for(day: int) -> AoCPuzzle:
+    puzzle = AoCPuzzle.__new__(AoCPuzzle)
+    puzzle.year, puzzle.day, puzzle.title = 2025, day, f"Benchmark Day {day}"
+    puzzle.description_text = f"Benchmark puzzle text for day {day}."
+    puzzle.part2_unlocked = True
+    return puzzle
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--fixtures", type=Path, help="Recorded fixtures (default: synthetic corpus)")
+    parser.add_argument("--synthetic-days", type=int, default=12)
+    parser.add_argument("--rounds", type=int, default=20, help="Repetitions per fixture for parse/validate")
+    parser.add_argument("--latency", type=float, default=0.0, help="Replayed seconds per response for generate()")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        fixtures_dir = args.fixtures
+        if fixtures_dir is None:
+            fixtures_dir = Path(scratch) / "fixtures"
+            fixtures_dir.mkdir()
+            synthetic_fixtures(fixtures_dir, args.synthetic_days)
+        fixtures = load_fixtures(fixtures_dir)
+        if not fixtures:
+            print(f"No fixtures in {fixtures_dir}")
+            return 1
+
+        # use_cache=False only skips lookups: results and history are still written, so keep them in scratch
+        generator = ScenarioGenerator("", use_cache=False, cache_dir=Path(scratch) / "generation")
+        generator.client = ReplayClient(fixtures_dir, latency=args.latency, strict=False)
+
+        # Only single-response generations can be parsed as whole scenarios
+        texts = []
+        for fixture in fixtures:
+            message = Message.model_validate(fixture["response"])
+            text = "".join(block.text for block in message.content if block.type == "text")
+            if '"levels"' in text:
+                texts.append(text)
+        if not texts:
+            print("No full-scenario responses among the fixtures")
+            return 1
+
+        print(f"{len(texts)} responses, {sum(map(len, texts)) / len(texts) / 1024:.1f} KB average\n")
+
+        extract_samples, schema_samples, validate_samples = [], [], []
+        for day, text in enumerate(texts, 1):
+            extract_samples += timed(lambda: generator._extract_json(text), args.rounds)
+            parsed = generator._extract_json(text)
+            parsed["day"], parsed["year"] = day, 2025
+            schema_samples += timed(lambda: validate_scenario(parsed), args.rounds)
+
+            def validate() -> None:
+                data = generator._extract_json(text)
+                data["day"], data["year"] = day, 2025
+                start = time.perf_counter()
+                generator._build_scenario(data)
+                validate_samples.append(time.perf_counter() - start)
+
+            for _ in range(args.rounds):
+                validate()
+
+        report("_extract_json", extract_samples)
+        report("validate_scenario", schema_samples)
+        report("_build_scenario", validate_samples)
+
+        # End to end, including prompt building and replayed latency; logging is quiet by default
+        generator.client._next = 0
+        start = time.perf_counter()
+        generate_samples = []
+        for day in range(1, len(texts) + 1):
+            generate_samples += timed(lambda: generator.generate(puzzle_for(day)), 1)
+        elapsed = time.perf_counter() - start
+        report("generate", generate_samples)
+        print(f"\ngenerate throughput: {len(texts) / elapsed:.1f} scenarios/s over {len(texts)} days")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
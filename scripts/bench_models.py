@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scenario model round trips - slotted models and dumps_indented vs asdict and json.dumps
+
+Loads a year of scenarios (the given JSON files, e.g. published ones, or
+stand-in scenarios for days 1-25) and times to_dict, to_json and from_dict
+against the previous implementation: plain dataclasses, dataclasses.asdict
+and json.dumps(indent=2). Also compares the memory a loaded year takes. The
+JSON written both ways must match byte for byte.
+
+    uv run python scripts/bench_models.py [scenario.json ...] [--rounds 20]
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.api_standin import standin_scenario  # noqa: E402
+from src.scenario_gen import NPC, LevelScenario, MultiLevelScenario, SolutionStep  # noqa: E402
+from src.schema import check_scenario  # noqa: E402
+
+
+def unslotted(cls: type) -> type:
+    """A plain (__dict__) dataclass with the same fields as `cls`."""
+    fields = [
+        (f.name, f.type) if f.default is dataclasses.MISSING else (f.name, f.type, f.default)
+        for f in dataclasses.fields(cls)
+    ]
+    return dataclasses.make_dataclass(f"Plain{cls.__name__}", fields)
+
+
+PlainNPC, PlainStep, PlainLevel, PlainScenario = map(unslotted, (NPC, SolutionStep, LevelScenario, MultiLevelScenario))
+
+
+def plain_to_dict(scenario) -> dict:
+    """The previous MultiLevelScenario.to_dict."""
+    data = {
+        "day": scenario.day,
+        "year": scenario.year,
+        "title": scenario.title,
+        "aoc_theme": scenario.aoc_theme,
+        "levels": {},
+        "continuity_hooks": scenario.continuity_hooks or {},
+        "part2_included": scenario.part2_included,
+    }
+    for level_key, level in scenario.levels.items():
+        data["levels"][level_key] = {
+            "career_title": level.career_title,
+            "setup_narrative": level.setup_narrative,
+            "initial_state": level.initial_state,
+            "npcs": [dataclasses.asdict(npc) for npc in level.npcs],
+            "solution_steps": [dataclasses.asdict(step) for step in level.solution_steps],
+            "optimal_turn_count": level.optimal_turn_count,
+            "consequences": level.consequences,
+            "hints": level.hints,
+            "victory_message": level.victory_message,
+        }
+    return data
+
+
+def plain_to_json(scenario) -> str:
+    return json.dumps(plain_to_dict(scenario), indent=2)
+
+
+def plain_from_dict(data: dict):
+    """The previous MultiLevelScenario.from_dict, building plain dataclasses."""
+    check_scenario(data)
+    levels = {}
+    for level_key, level_data in data.get("levels", {}).items():
+        npcs = [PlainNPC(**npc) for npc in level_data.get("npcs", [])]
+        steps = []
+        for step_data in level_data.get("solution_steps", []):
+            step_data.setdefault("unlocks", None)
+            step_data.setdefault("victory", False)
+            step_data.setdefault("state_changes", {})
+            steps.append(PlainStep(**step_data))
+        levels[level_key] = PlainLevel(
+            career_title=level_data.get("career_title", ""),
+            setup_narrative=level_data.get("setup_narrative", ""),
+            initial_state=level_data.get("initial_state", {}),
+            npcs=npcs,
+            solution_steps=steps,
+            optimal_turn_count=level_data.get("optimal_turn_count", 4),
+            consequences=level_data.get("consequences", {}),
+            hints=level_data.get("hints", []),
+            victory_message=level_data.get("victory_message", ""),
+        )
+    return PlainScenario(
+        day=data.get("day", 0),
+        year=data.get("year", 0),
+        title=data.get("title", ""),
+        aoc_theme=data.get("aoc_theme", ""),
+        levels=levels,
+        continuity_hooks=data.get("continuity_hooks"),
+        part2_included=data.get("part2_included", True),
+    )
+
+
+def load_scenarios(paths: list[str], days: int) -> list[str]:
+    """Scenario JSON texts from the given files or the stand-in."""
+    if paths:
+        return [Path(path).read_text() for path in paths]
+    texts = []
+    for day in range(1, days + 1):
+        data = standin_scenario(day)
+        data["day"], data["year"] = day, 2025
+        texts.append(json.dumps(data, indent=2))
+    return texts
+
+
+def timed(fn, items: list, rounds: int) -> tuple[list, float]:
+    """Run fn over every item `rounds` times. Returns (last results, mean seconds per round)."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        results = [fn(item) for item in items]
+    return results, (time.perf_counter() - start) / rounds
+
+
+def loaded_size(from_dict, texts: list[str]) -> int:
+    """Bytes still allocated after parsing and building every scenario."""
+    tracemalloc.start()
+    try:
+        scenarios = [from_dict(json.loads(text)) for text in texts]
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del scenarios
+    return size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("scenarios", nargs="*", help="Scenario JSON files (default: stand-in scenarios)")
+    parser.add_argument("--days", type=int, default=25, help="Stand-in scenarios to generate")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = load_scenarios(args.scenarios, args.days)
+    if not texts:
+        print("No scenarios")
+        return 1
+    print(f"{len(texts)} scenarios, {sum(map(len, texts)) / len(texts) / 1024:.1f} KB average\n")
+
+    plain = [plain_from_dict(json.loads(text)) for text in texts]
+    slotted = [MultiLevelScenario.from_dict(json.loads(text)) for text in texts]
+
+    def plain_round_trip(scenario):
+        return plain_from_dict(json.loads(plain_to_json(scenario)))
+
+    def slotted_round_trip(scenario):
+        return MultiLevelScenario.from_dict(json.loads(scenario.to_json()))
+
+    print(f"{'step':<12} {'old ms':>9} {'new ms':>9} {'speedup':>8}")
+    rows = [
+        ("to_dict", plain_to_dict, MultiLevelScenario.to_dict, plain, slotted),
+        ("to_json", plain_to_json, MultiLevelScenario.to_json, plain, slotted),
+        ("from_dict", plain_from_dict, MultiLevelScenario.from_dict,
+         [json.loads(text) for text in texts], [json.loads(text) for text in texts]),
+        ("round trip", plain_round_trip, slotted_round_trip, plain, slotted),
+    ]
+    outputs = {}
+    for name, old_fn, new_fn, old_items, new_items in rows:
+        old_result, old_time = timed(old_fn, old_items, args.rounds)
+        new_result, new_time = timed(new_fn, new_items, args.rounds)
+        outputs[name] = (old_result, new_result)
+        print(f"{name:<12} {old_time * 1000:>9.3f} {new_time * 1000:>9.3f} {old_time / new_time:>7.1f}x")
+
+    old_size = loaded_size(plain_from_dict, texts)
+    new_size = loaded_size(MultiLevelScenario.from_dict, texts)
+    print(f"\nLoaded year: old {old_size / 1024:.1f} KiB, new {new_size / 1024:.1f} KiB "
+          f"({(1 - new_size / old_size) * 100:.0f}% smaller)")
+
+    old_json, new_json = outputs["to_json"]
+    mismatches = sum(old != new for old, new in zip(old_json, new_json))
+    mismatches += sum(plain_to_json(old) != new.to_json() for old, new in zip(*outputs["round trip"]))
+    if mismatches:
+        print(f"{mismatches} scenario(s) serialized differently")
+        return 1
+    print("Output identical byte for byte")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
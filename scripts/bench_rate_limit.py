@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: TokenBucket acquire overhead, in-process and through the shared state file
+
+Draws from an effectively unlimited bucket so only the bookkeeping is
+timed, then checks that an AoCClient built with a small burst (default 1,
+below SUBMIT_COST) can still pay for a submission.
+
+    uv run python scripts/bench_rate_limit.py [--rounds 2000] [--burst 1]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.aoc_client import AoCClient  # noqa: E402
+from src.rate_limit import TokenBucket  # noqa: E402
+
+
+def timed(bucket: TokenBucket, rounds: int) -> float:
+    """Mean seconds per acquire() over `rounds` calls."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        bucket.acquire()
+    return (time.perf_counter() - start) / rounds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--burst", type=float, default=1.0, help="Burst size for the submit-cost check")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        in_process = TokenBucket(rate=1e9, burst=1e9)
+        shared = TokenBucket(rate=1e9, burst=1e9, state_path=Path(scratch) / "ratelimit.json")
+        print(f"{'in-process':<12} {timed(in_process, args.rounds) * 1e6:8.2f} us/acquire")
+        print(f"{'state file':<12} {timed(shared, args.rounds) * 1e6:8.2f} us/acquire")
+
+        # Nothing is fetched: the client only needs its own cache directory
+        client_class = type("ScratchClient", (AoCClient,), {"CACHE_DIR": Path(scratch) / "aoc"})
+        client = client_class("bench", requests_per_second=1e9, burst=args.burst)
+        try:
+            client.rate_limiter.acquire(client.submit_cost)
+        except ValueError as e:
+            print(f"burst {args.burst:g}: a submission can't be paid for ({e})")
+            return 1
+        print(f"burst {args.burst:g}: submissions cost {client.submit_cost:g} of SUBMIT_COST {AoCClient.SUBMIT_COST:g}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,15 +2,35 @@
 Handles all interaction with adventofcode.com
 """
 
+import asyncio
+import hashlib
+import logging
 import re
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
 import requests
 from bs4 import BeautifulSoup
 
+from .cache import CacheStore, account_id
+from .html_extract import UnsupportedMarkup, extract_calendar_days, extract_puzzle_page
+from .http_cache import CachedResponse, HTTPCache
+from .http_transport import RETRY_STATUSES, build_session, retry_delay
+from .puzzle_input import PuzzleInput
+from .puzzle_store import PuzzleStore
+from .rate_limit import TokenBucket
+from .submissions import (
+    AnswerLedger,
+    SubmissionQueue,
+    SubmissionResult,
+    SubmissionStatus,
+    parse_submission_response,
+)
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class AoCPuzzle:
@@ -19,122 +39,306 @@ class AoCPuzzle:
     title: str
     description_html: str
     description_text: str  # Cleaned for Claude
-    input_data: str
+    input: PuzzleInput  # Lazily fetched and memory-mapped from the cache file
     part2_unlocked: bool
     part2_description: Optional[str] = None
 
+    @property
+    def input_data(self) -> str:
+        """Full puzzle input as a string (prefer `input.lines()` for large inputs)."""
+        return self.input.text
+
+
+def _title_from_heading(heading: Optional[str], year: int) -> str:
+    """Pull the puzzle title out of the page's first <h2> text."""
+    if heading:
+        # Title format: "--- Day X: Title ---"
+        match = re.search(r"--- Day \d+: (.+) ---", heading)
+        if match:
+            return match.group(1)
+    return f"Day {year} Puzzle"
+
+
+def _combine_articles(articles: list[tuple[str, str]]) -> tuple[str, str, bool, Optional[str]]:
+    """
+    Combine (html, text) pairs of the day-desc articles into a description.
+    Returns: (html, text, part2_unlocked, part2_text)
+    """
+    if not articles:
+        raise ValueError("Could not find puzzle description")
+
+    # Part 1 is always the first article
+    part1_html, part1_text = articles[0]
+
+    # Check if Part 2 is unlocked
+    part2_unlocked = len(articles) > 1
+    part2_text = None
+
+    if part2_unlocked:
+        part2_text = articles[1][1]
+        # Combine for full description
+        full_text = part1_text + "\n\n--- Part Two ---\n\n" + part2_text
+    else:
+        full_text = part1_text
+
+    return part1_html, full_text, part2_unlocked, part2_text
+
+
+def _extract_title(soup: BeautifulSoup, year: int) -> str:
+    """Extract puzzle title from page."""
+    title_elem = soup.find("h2")
+    return _title_from_heading(title_elem.get_text() if title_elem else None, year)
+
+
+def _extract_description(soup: BeautifulSoup) -> tuple[str, str, bool, Optional[str]]:
+    """
+    Extract puzzle description from page.
+    Returns: (html, text, part2_unlocked, part2_text)
+    """
+    articles = soup.find_all("article", class_="day-desc")
+    return _combine_articles([
+        (str(article), article.get_text(separator="\n", strip=True))
+        for article in articles[:2]
+    ])
+
+
+def parse_puzzle_page(body: str, year: int, fast_extract: bool = True) -> dict:
+    """
+    Parse a puzzle page into AoCPuzzle description fields. The streaming
+    extractor is tried first (with `fast_extract`), BeautifulSoup otherwise.
+    """
+    page = None
+    if fast_extract:
+        try:
+            page = extract_puzzle_page(body)
+        except UnsupportedMarkup:
+            page = None
+
+    if page and page.articles:
+        title = _title_from_heading(page.heading, year)
+        desc_html, desc_text, part2_unlocked, part2_text = _combine_articles(page.articles)
+    else:
+        # Full BeautifulSoup parse for anything the fast path can't handle
+        soup = BeautifulSoup(body, "html.parser")
+        title = _extract_title(soup, year)
+        desc_html, desc_text, part2_unlocked, part2_text = _extract_description(soup)
+
+    return {
+        "title": title,
+        "description_html": desc_html,
+        "description_text": desc_text,
+        "part2_unlocked": part2_unlocked,
+        "part2_description": part2_text,
+    }
+
+
+def _extract_calendar_days(soup: BeautifulSoup) -> list[int]:
+    """Extract unlocked days from the calendar page."""
+    days = []
+    # Look for calendar entries that are active (have links)
+    for link in soup.find_all("a", class_="calendar-day"):
+        href = link.get("href", "")
+        match = re.search(r"/day/(\d+)", href)
+        if match:
+            days.append(int(match.group(1)))
+
+    # Also check for unlocked days without special styling
+    for link in soup.select("pre.calendar a"):
+        href = link.get("href", "")
+        match = re.search(r"/day/(\d+)", href)
+        if match:
+            day = int(match.group(1))
+            if day not in days:
+                days.append(day)
+
+    return sorted(days)
+
+
+def parse_calendar_days(body: str, fast_extract: bool = True) -> list[int]:
+    """Unlocked days on a calendar page."""
+    if fast_extract:
+        return extract_calendar_days(body)
+    return _extract_calendar_days(BeautifulSoup(body, "html.parser"))
+
 
 class AoCClient:
     BASE_URL = "https://adventofcode.com"
     CACHE_DIR = Path(".cache/aoc")
 
-    def __init__(self, session_cookie: str, year: int = 2025):
-        self.session = requests.Session()
+    SUBMIT_COST = 2.0  # Submissions draw twice the budget of a page fetch (at most the whole burst)
+    HTTP_CACHE_BYTES = 64 * 1024 * 1024  # LRU cap for cached pages
+    FETCH_RETRIES = 3  # For RETRY_STATUSES responses, each through the rate limiter
+    PART1_RECHECK_SECONDS = 600  # How long a Part 1-only record is trusted without revalidating
+
+    def __init__(
+        self,
+        session_cookie: str,
+        year: int = 2025,
+        requests_per_second: float = 1.0,
+        burst: float = 4.0,
+        fast_extract: bool = True,
+    ):
+        self.session = build_session()  # Pooled, retrying, timed; see http_transport
         self.session.cookies.set("session", session_cookie, domain=".adventofcode.com")
         self.session.headers.update({
             "User-Agent": "advent-of-management/1.0 (github.com/yourusername/advent-of-management)"
         })
         self.year = year
+        self.fast_extract = fast_extract  # Streaming extractor first, BeautifulSoup as fallback
         self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
-
-    def _get_cached(self, key: str) -> Optional[str]:
-        """Get cached content if available."""
-        cache_file = self.CACHE_DIR / f"{self.year}_{key}.txt"
-        if cache_file.exists():
-            return cache_file.read_text()
-        return None
-
-    def _set_cached(self, key: str, content: str) -> None:
-        """Cache content for future use."""
-        cache_file = self.CACHE_DIR / f"{self.year}_{key}.txt"
-        cache_file.write_text(content)
-
-    def _fetch_with_delay(self, url: str, delay: float = 1.0) -> requests.Response:
-        """Fetch URL with rate limiting delay."""
-        time.sleep(delay)  # Be nice to AoC servers
-        response = self.session.get(url)
+        # Pages and inputs are personal, so they are sharded per year and per account
+        account = account_id(session_cookie)
+        shard = (str(year), account)
+        self.input_cache = CacheStore(self.CACHE_DIR / "inputs", shard=shard)  # Raw so it can be mmapped
+        self.http_cache = HTTPCache(
+            CacheStore(self.CACHE_DIR / "http", shard=shard, compression="gzip", max_bytes=self.HTTP_CACHE_BYTES)
+        )
+        # Part 2 unlocks per account, so parsed descriptions are kept per account too
+        self.puzzle_store = PuzzleStore(self.CACHE_DIR / "puzzles" / f"{account}.sqlite3")
+        # Verdicts and cooldowns are per account as well
+        self.ledger = AnswerLedger(self.CACHE_DIR / "submissions" / f"{account}.sqlite3")
+        self.submission_queue = SubmissionQueue(self.CACHE_DIR / "submissions" / f"{account}.sqlite3")
+        # Shared with every other client on this host through the state file
+        self.rate_limiter = TokenBucket(
+            rate=requests_per_second,
+            burst=burst,
+            state_path=self.CACHE_DIR / "ratelimit.json",
+        )
+        # A bucket smaller than SUBMIT_COST could never pay for a submission
+        self.submit_cost = min(self.SUBMIT_COST, burst)
+
+    def _import_legacy_input(self, key: str) -> bool:
+        """Move an input cached by older versions (flat .cache/aoc/{year}_{key}.txt) into the store."""
+        legacy = self.CACHE_DIR / f"{self.year}_{key}.txt"
+        if not legacy.exists():
+            return False
+        self.input_cache.put(key, legacy.read_bytes())
+        legacy.unlink()
+        return True
+
+    def _fetch(self, url: str, headers: Optional[dict] = None) -> requests.Response:
+        """
+        Fetch URL, waiting only if the shared rate limit budget is exhausted.
+        Throttled and transient server errors are retried here, so every
+        retry draws on the budget too.
+        """
+        for attempt in range(self.FETCH_RETRIES + 1):
+            self.rate_limiter.acquire()  # Be nice to AoC servers
+            response = self.session.get(url, headers=headers)
+            if response.status_code not in RETRY_STATUSES or attempt == self.FETCH_RETRIES:
+                break
+            delay = retry_delay(response, attempt)
+            logger.warning(f"{url} returned {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
         response.raise_for_status()
         return response
 
-    def _extract_title(self, soup: BeautifulSoup) -> str:
-        """Extract puzzle title from page."""
-        title_elem = soup.find("h2")
-        if title_elem:
-            # Title format: "--- Day X: Title ---"
-            match = re.search(r"--- Day \d+: (.+) ---", title_elem.get_text())
-            if match:
-                return match.group(1)
-        return f"Day {self.year} Puzzle"
-
-    def _extract_description(self, soup: BeautifulSoup) -> tuple[str, str, bool, Optional[str]]:
+    def _fetch_page(self, url: str) -> tuple[CachedResponse, bool]:
         """
-        Extract puzzle description from page.
-        Returns: (html, text, part2_unlocked, part2_text)
+        Fetch a page using a conditional GET against the HTTP cache.
+        Returns: (entry, modified) - modified is False when the cached body is still current.
         """
-        articles = soup.find_all("article", class_="day-desc")
-
-        if not articles:
-            raise ValueError("Could not find puzzle description")
-
-        # Part 1 is always the first article
-        part1_html = str(articles[0])
-        part1_text = articles[0].get_text(separator="\n", strip=True)
-
-        # Check if Part 2 is unlocked
-        part2_unlocked = len(articles) > 1
-        part2_text = None
+        cached = self.http_cache.get(url)
+        response = self._fetch(url, headers=self.http_cache.conditional_headers(cached))
+
+        if response.status_code == 304 and cached:
+            return self.http_cache.refresh(cached), False
+
+        # Servers without validators still send the same body when nothing changed
+        if cached and cached.body == response.text:
+            cached.etag = response.headers.get("ETag", cached.etag)
+            cached.last_modified = response.headers.get("Last-Modified", cached.last_modified)
+            return self.http_cache.refresh(cached), False
+
+        entry = CachedResponse(
+            url=url,
+            body=response.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.time(),
+        )
+        self.http_cache.put(entry)
+        return entry, True
 
-        if part2_unlocked:
-            part2_text = articles[1].get_text(separator="\n", strip=True)
-            # Combine for full description
-            full_text = part1_text + "\n\n--- Part Two ---\n\n" + part2_text
-        else:
-            full_text = part1_text
+    def _get_description(self, day: int) -> dict:
+        """
+        Get the parsed puzzle description fields for AoCPuzzle.
 
-        return part1_html, full_text, part2_unlocked, part2_text
+        A stored Part 2 record is final, so it is served without touching the
+        network. Part 1 records are trusted for PART1_RECHECK_SECONDS, after
+        which the page is revalidated in case Part 2 unlocked.
+        """
+        record = self.puzzle_store.get(self.year, day, part2_unlocked=True)
+        if record:
+            return self.puzzle_store.description(record)
 
-    def get_puzzle(self, day: int) -> AoCPuzzle:
-        """Fetch puzzle description and input for a given day."""
-        # Try cache first for input (input never changes)
-        cached_input = self._get_cached(f"day{day}_input")
+        record = self.puzzle_store.get(self.year, day, part2_unlocked=False)
+        if record and time.time() - record["stored_at"] < self.PART1_RECHECK_SECONDS:
+            return self.puzzle_store.description(record)
 
-        # Fetch puzzle page (don't cache - part 2 may unlock)
         url = f"{self.BASE_URL}/{self.year}/day/{day}"
-        response = self._fetch_with_delay(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        title = self._extract_title(soup)
-        desc_html, desc_text, part2_unlocked, part2_text = self._extract_description(soup)
-
-        # Get input (cached or fetch)
-        if cached_input:
-            input_data = cached_input
-        else:
-            input_url = f"{self.BASE_URL}/{self.year}/day/{day}/input"
-            input_response = self._fetch_with_delay(input_url)
-            input_data = input_response.text
-            self._set_cached(f"day{day}_input", input_data)
-
-        return AoCPuzzle(
-            year=self.year,
-            day=day,
-            title=title,
-            description_html=desc_html,
-            description_text=desc_text,
-            input_data=input_data,
-            part2_unlocked=part2_unlocked,
-            part2_description=part2_text,
-        )
+        page, _ = self._fetch_page(url)
+
+        # Unchanged page - reuse the record parsed from it
+        page_hash = hashlib.sha256(page.body.encode()).hexdigest()
+        record = self.puzzle_store.get_by_hash(self.year, day, page_hash)
+        if record:
+            # Restart the recheck window, or every call after the first one revalidates
+            self.puzzle_store.touch(self.year, day, record["part2_unlocked"])
+            return self.puzzle_store.description(record)
+
+        description = parse_puzzle_page(page.body, self.year, self.fast_extract)
+        self.puzzle_store.put(self.year, day, page_hash, description)
+        return description
+
+    def _download_input(self, day: int) -> None:
+        """Download puzzle input into the cache (input never changes)."""
+        if self._import_legacy_input(f"day{day}_input"):
+            return
+        input_url = f"{self.BASE_URL}/{self.year}/day/{day}/input"
+        input_response = self._fetch(input_url)
+        self.input_cache.put(f"day{day}_input", input_response.content)
+
+    def _get_input(self, day: int) -> PuzzleInput:
+        """Get a lazy handle on the puzzle input; nothing is downloaded until it is read."""
+        return PuzzleInput(self.input_cache, f"day{day}_input", fetch=lambda: self._download_input(day))
+
+    def get_puzzle(self, day: int, prefetch_input: bool = False) -> AoCPuzzle:
+        """
+        Fetch puzzle description for a given day.
+        The input is loaded on first use unless `prefetch_input` is set.
+        """
+        description = self._get_description(day)
+        puzzle_input = self._get_input(day)
+        if prefetch_input:
+            puzzle_input.ensure()
+        return AoCPuzzle(year=self.year, day=day, input=puzzle_input, **description)
 
-    def submit_answer(self, day: int, part: int, answer: str) -> tuple[bool, str]:
+    def submit(self, day: int, part: int, answer: str) -> SubmissionResult:
         """
-        Submit an answer. Returns (success, message).
+        Submit an answer and return a structured result.
+
+        Answers the ledger already knows are wrong, and submissions during a
+        known cooldown, are answered locally without contacting AoC.
         """
+        known = self.ledger.check(self.year, day, part, answer)
+        if known:
+            return known
+
+        cooldown = self.submission_queue.cooldown_until() - time.time()
+        if cooldown > 0:
+            return SubmissionResult(
+                SubmissionStatus.RATE_LIMITED,
+                f"Rate limited - wait {int(cooldown) // 60}m {int(cooldown) % 60}s",
+                retry_after=cooldown,
+                local=True,
+            )
+
         url = f"{self.BASE_URL}/{self.year}/day/{day}/answer"
         data = {"level": str(part), "answer": str(answer)}
 
-        # Longer delay before submission to be extra respectful
-        time.sleep(2.0)
+        # Submissions cost more of the budget to be extra respectful
+        self.rate_limiter.acquire(self.submit_cost)
 
         response = self.session.post(url, data=data)
         response.raise_for_status()
@@ -143,63 +347,90 @@ class AoCClient:
         soup = BeautifulSoup(response.text, "html.parser")
         main = soup.find("main")
         if not main:
-            return False, "Could not parse response"
-
-        text = main.get_text()
-
-        if "That's the right answer" in text:
-            return True, "Correct!"
-        elif "That's not the right answer" in text:
-            # Try to extract hint
-            if "too low" in text.lower():
-                return False, "Incorrect - answer is too low"
-            elif "too high" in text.lower():
-                return False, "Incorrect - answer is too high"
-            return False, "Incorrect"
-        elif "You gave an answer too recently" in text:
-            # Extract wait time
-            match = re.search(r"You have (\d+)m? ?(\d+)?s? left to wait", text)
-            if match:
-                mins = int(match.group(1)) if match.group(1) else 0
-                secs = int(match.group(2)) if match.group(2) else 0
-                return False, f"Rate limited - wait {mins}m {secs}s"
-            return False, "Rate limited - please wait"
-        elif "You don't seem to be solving the right level" in text:
-            return False, "Already solved or wrong part"
-        else:
-            return False, f"Unknown response: {text[:200]}"
+            return SubmissionResult(SubmissionStatus.UNKNOWN, "Could not parse response")
+
+        result = parse_submission_response(main.get_text())
+        self.ledger.record(self.year, day, part, answer, result)
+        if result.retry_after:
+            self.submission_queue.set_cooldown(result.retry_after)
+
+        if result.success and part == 1:
+            # Part 2 is now unlocked - the stored Part 1 page is out of date
+            self.puzzle_store.invalidate(self.year, day, part2_unlocked=False)
+        return result
+
+    def submit_answer(self, day: int, part: int, answer: str) -> tuple[bool, str]:
+        """
+        Submit an answer. Returns (success, message).
+        """
+        result = self.submit(day, part, answer)
+        return result.success, result.message
+
+    def queue_answer(self, day: int, part: int, answer: str) -> int:
+        """Queue an answer to be submitted once any cooldown has passed. Returns the queue id."""
+        return self.submission_queue.enqueue(self.year, day, part, answer)
+
+    def process_submission_queue(self, wait: bool = True) -> list[SubmissionResult]:
+        """Submit queued answers, sleeping through cooldowns when `wait` is set."""
+        return self.submission_queue.drain(self.year, self.submit, wait=wait)
 
     def get_available_days(self) -> list[int]:
         """Return list of days currently available."""
         url = f"{self.BASE_URL}/{self.year}"
-        response = self._fetch_with_delay(url)
-        soup = BeautifulSoup(response.text, "html.parser")
+        page, modified = self._fetch_page(url)
+        if not modified and page.parsed:
+            return list(page.parsed["days"])
+
+        days = parse_calendar_days(page.body, self.fast_extract)
+
+        page.parsed = {"days": days}
+        self.http_cache.put(page)
 
-        days = []
-        # Look for calendar entries that are active (have links)
-        for link in soup.find_all("a", class_="calendar-day"):
-            href = link.get("href", "")
-            match = re.search(r"/day/(\d+)", href)
-            if match:
-                days.append(int(match.group(1)))
-
-        # Also check for unlocked days without special styling
-        for link in soup.select("pre.calendar a"):
-            href = link.get("href", "")
-            match = re.search(r"/day/(\d+)", href)
-            if match:
-                day = int(match.group(1))
-                if day not in days:
-                    days.append(day)
-
-        return sorted(days)
+        return days
 
     def get_leaderboard_position(self, day: int) -> Optional[dict]:
         """Get personal stats for a day if available."""
         url = f"{self.BASE_URL}/{self.year}/leaderboard/self"
-        response = self._fetch_with_delay(url)
+        response = self._fetch(url)
         soup = BeautifulSoup(response.text, "html.parser")
 
         # Parse personal leaderboard (implementation depends on structure)
         # This is optional functionality
         return None
+
+
+class AsyncAoCClient:
+    """
+    asyncio front-end for AoCClient.
+
+    Page (and input) requests for many days run concurrently in worker threads
+    (so HTML parsing stays off the event loop), bounded by `max_concurrency`
+    in-flight requests and by the wrapped client's shared rate limiter.
+    """
+
+    def __init__(self, client: AoCClient, max_concurrency: int = 4):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _run(self, fn, *args):
+        """Run a blocking client call in a worker thread under the concurrency limit."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await asyncio.to_thread(fn, *args)
+
+    async def aget_puzzle(self, day: int, prefetch_input: bool = False) -> AoCPuzzle:
+        """Fetch puzzle description (and optionally the input) for a given day concurrently."""
+        puzzle_input = self.client._get_input(day)
+        fetches = [self._run(self.client._get_description, day)]
+        if prefetch_input:
+            fetches.append(self._run(puzzle_input.ensure))
+        description, *_ = await asyncio.gather(*fetches)
+        return AoCPuzzle(year=self.client.year, day=day, input=puzzle_input, **description)
+
+    async def get_puzzles(self, days: Iterable[int], prefetch_input: bool = False) -> list[AoCPuzzle]:
+        """Fetch several days at once. Results are in the same order as `days`."""
+        return list(await asyncio.gather(
+            *(self.aget_puzzle(day, prefetch_input=prefetch_input) for day in days)
+        ))
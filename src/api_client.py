@@ -0,0 +1,217 @@
+"""
+Shared Anthropic client with a bounded, self-tuning number of requests in flight
+
+Every generation call goes through one APIClient. It caps concurrent
+requests, grows that cap additively while requests succeed and halves it on
+429/529 overload responses (AIMD), pauses everyone for the server's
+retry-after, applies a per-request timeout, and retries overloads, timeouts
+and transient server errors with backoff.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Optional
+
+import anthropic
+
+logger = logging.getLogger(__name__)
+
+OVERLOAD_STATUSES = {429, 529}
+RETRYABLE_STATUSES = {408, 409, 500, 502, 503, 504} | OVERLOAD_STATUSES
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait, if the error carries retry-after."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue  # HTTP-date form - fall back to our own backoff
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (anthropic.APITimeoutError, anthropic.APIConnectionError)):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and error.status_code in RETRYABLE_STATUSES
+
+
+def is_overload(error: BaseException) -> bool:
+    return isinstance(error, anthropic.APIStatusError) and error.status_code in OVERLOAD_STATUSES
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit. Each success raises the limit by 1/limit (about
+    +1 per limit's worth of requests); each overload multiplies it by
+    `decrease` and, with a retry-after, holds back new requests until then.
+    """
+
+    def __init__(self, max_in_flight: int, min_in_flight: int = 1, decrease: float = 0.5):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min(min_in_flight, max_in_flight)
+        self.decrease = decrease
+        self.limit = float(max_in_flight)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=pause if pause > 0 else None)
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def succeeded(self) -> None:
+        with self._cond:
+            self.limit = min(self.max_in_flight, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def overloaded(self, wait: Optional[float] = None) -> None:
+        with self._cond:
+            self.limit = max(self.min_in_flight, self.limit * self.decrease)
+            if wait:
+                self.paused_until = max(self.paused_until, time.monotonic() + wait)
+            logger.warning(f"API overloaded - concurrency limit now {int(self.limit)}")
+
+
+class _LimitedStream:
+    """Context manager holding a limiter slot for the life of a stream."""
+
+    def __init__(self, client: "APIClient", params: dict):
+        self._client = client
+        self._params = params
+        self._manager = None
+
+    def __enter__(self) -> Any:
+        # Errors on opening (the request itself) are retried; errors mid-stream go to the caller
+        def open_stream():
+            manager = self._client.inner.messages.stream(**self._params)
+            stream = manager.__enter__()
+            self._manager = manager
+            return stream
+
+        return self._client.call(open_stream, release=False)
+
+    def __exit__(self, exc_type, exc, tb) -> Any:
+        try:
+            return self._manager.__exit__(exc_type, exc, tb)
+        finally:
+            if exc is None:
+                self._client.limiter.succeeded()
+            elif is_overload(exc):
+                self._client.limiter.overloaded(retry_after(exc))
+            self._client.limiter.release()
+
+
+class _Messages:
+    def __init__(self, client: "APIClient"):
+        self._client = client
+
+    @property
+    def batches(self) -> Any:
+        # Batch calls are cheap control-plane requests; they aren't limited
+        return self._client.inner.messages.batches
+
+    def count_tokens(self, **params) -> Any:
+        # Free and separately rate limited, so it doesn't take a generation slot
+        return self._client.inner.messages.count_tokens(**params)
+
+    def create(self, **params) -> Any:
+        self._client.apply_timeout(params)
+        return self._client.call(lambda: self._client.inner.messages.create(**params))
+
+    def stream(self, **params) -> _LimitedStream:
+        self._client.apply_timeout(params)
+        return _LimitedStream(self._client, params)
+
+
+class APIClient:
+    """
+    Drop-in for anthropic.Anthropic (messages.create/stream/count_tokens/batches) that
+    bounds and adapts concurrency and retries transient failures. Share one
+    instance between threads.
+    """
+
+    def __init__(
+        self,
+        inner: Any,
+        max_in_flight: int = 4,
+        timeout: Optional[float] = 300.0,
+        max_retries: int = 4,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.inner = inner  # Built with max_retries=0 - retries happen here, in step with the limiter
+        self.limiter = AdaptiveLimiter(max_in_flight)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.messages = _Messages(self)
+
+    @classmethod
+    def create(
+        cls,
+        api_key: str,
+        base_url: Optional[str] = None,
+        **options,
+    ) -> "APIClient":
+        return cls(anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0), **options)
+
+    def apply_timeout(self, params: dict) -> None:
+        if self.timeout is not None:
+            params.setdefault("timeout", self.timeout)
+
+    def _delay(self, attempt: int, error: BaseException) -> float:
+        """Server's retry-after if given, else jittered exponential backoff."""
+        wait = retry_after(error)
+        if wait is not None:
+            return wait
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def call(self, request, release: bool = True) -> Any:
+        """
+        Run request() in a limiter slot, retrying retryable failures. With
+        release=False the slot stays held after success (streams release it
+        when they close).
+        """
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                result = request()
+            except Exception as e:
+                self.limiter.release()
+                # Even the last overload of a burst lowers the limit for the next caller
+                if is_overload(e):
+                    self.limiter.overloaded(retry_after(e))
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self._delay(attempt, e)
+                logger.warning(f"API request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if release:
+                self.limiter.succeeded()
+                self.limiter.release()
+            return result
@@ -0,0 +1,350 @@
+"""
+Local stand-in for the Anthropic Messages, token counting and Message Batches endpoints
+
+Lets batch backfills (and plain or streamed generation) run end to end
+without an API key or spend. Every request is answered with a small, valid
+scenario for the day named in the prompt, or with recorded responses from a
+fixtures directory (see src/replay.py); failures can be injected to
+exercise retries.
+
+    uv run python -m src.api_standin --port 8765 --fail-first 2
+    uv run python -m src.api_standin --fixtures fixtures/generator --latency 2
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 uv run python -m src.main --batch --output /tmp/aom-standin
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from .replay import ReplayClient
+
+DAY_PATTERN = re.compile(r"\*\*Day\*\*: (\d+)")
+SINGLE_LEVEL_PATTERN = re.compile(r'would go under "(level_\d)"')
+REPAIR_PATTERN = re.compile(r"whose keys are exactly: ([^.]+)\.")
+LEVEL_TITLES = ["Team Lead", "Supervisor", "Manager", "Director", "VP", "C-Suite"]
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _content_text(message: dict) -> str:
+    content = message["content"]
+    return content if isinstance(content, str) else json.dumps(content)
+
+
+def is_standin_url(base_url: Optional[str]) -> bool:
+    """True for an API endpoint on this machine, which is where the stand-in runs."""
+    return bool(base_url) and urlparse(base_url).hostname in LOCAL_HOSTS
+
+
+def standin_scenario(day: int) -> dict:
+    """A minimal scenario that passes ScenarioGenerator validation."""
+    levels = {}
+    for number, career_title in enumerate(LEVEL_TITLES, 1):
+        levels[f"level_{number}"] = {
+            "career_title": career_title,
+            "setup_narrative": f"Stand-in setup for day {day}, level {number}.",
+            "initial_state": {"morale": 50, "budget": 100},
+            "npcs": [{"name": "Jingles", "role": "Senior Systems Administrator (Intern)", "quirk": "None", "secret": "None"}],
+            "solution_steps": [{
+                "step": 1,
+                "description": "Resolve the stand-in problem",
+                "action_patterns": ["resolve"],
+                "narrative_result": "Resolved.",
+                "state_changes": {"morale": 10},
+                "victory": True,
+            }],
+            "optimal_turn_count": 1,
+            "consequences": {},
+            "hints": ["It's a stand-in."],
+            "victory_message": "Stand-in victory!",
+        }
+    return {
+        "title": f"Stand-in Scenario for Day {day}",
+        "aoc_theme": "stand-in",
+        "continuity_hooks": {"references_past": "", "sets_up_future": ""},
+        "levels": levels,
+    }
+
+
+def standin_response(prompt: str) -> dict:
+    """Answer the kind of request the prompt makes: whole day, skeleton, one level or a repair."""
+    match = DAY_PATTERN.search(prompt)
+    scenario = standin_scenario(int(match.group(1)) if match else 1)
+    if match := SINGLE_LEVEL_PATTERN.search(prompt):
+        return scenario["levels"][match.group(1)]
+    if match := REPAIR_PATTERN.search(prompt):
+        return {key: scenario["levels"][key] for key in re.findall(r"level_\d", match.group(1))}
+    if '"title", "aoc_theme", "continuity_hooks"' in prompt:
+        return {key: scenario[key] for key in ("title", "aoc_theme", "continuity_hooks")}
+    return scenario
+
+
+class StandinAPI:
+    """
+    In-memory state behind the stand-in server.
+
+    fail_first: the first N distinct custom_ids come back errored the first time.
+    invalid_first: the next N distinct custom_ids then come back with invalid JSON once.
+    batch_seconds: how long a batch stays in_progress.
+    replay: answer from recorded fixtures instead of stand-in scenarios.
+    overload_first: the first N /v1/messages requests get 529 with retry-after.
+    """
+
+    def __init__(
+        self,
+        fail_first: int = 0,
+        invalid_first: int = 0,
+        batch_seconds: float = 1.0,
+        replay: Optional[ReplayClient] = None,
+        overload_first: int = 0,
+    ):
+        self.fail_first = fail_first
+        self.invalid_first = invalid_first
+        self.batch_seconds = batch_seconds
+        self.replay = replay
+        self.overload_first = overload_first
+        self.message_requests = 0
+        self.batches: dict[str, dict[str, Any]] = {}
+        self.seen: dict[str, int] = {}  # custom_id -> order first seen
+        self.lock = threading.Lock()
+
+    def overloaded(self) -> bool:
+        """Count a /v1/messages request; True if it should be rejected as overloaded."""
+        with self.lock:
+            self.message_requests += 1
+            return self.message_requests <= self.overload_first
+
+    def message(self, params: dict, text: Optional[str] = None) -> dict:
+        if text is None and self.replay is not None:
+            message, latency = self.replay.lookup(params)
+            time.sleep(latency)
+            return message.model_dump(mode="json")
+        stop_reason = "end_turn"
+        if text is None:
+            messages = params.get("messages", [])
+            prompt = "".join(_content_text(message) for message in messages if message["role"] == "user")
+            text = json.dumps(standin_response(prompt))
+            # Honour an assistant prefill (a continuation) and cut the answer off at max_tokens
+            if messages and messages[-1]["role"] == "assistant" and text.startswith(_content_text(messages[-1])):
+                text = text[len(_content_text(messages[-1])):]
+            max_chars = params.get("max_tokens", len(text)) * 4
+            if len(text) > max_chars:
+                text, stop_reason = text[:max_chars], "max_tokens"
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": params.get("model", "stand-in"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": 100,
+                "output_tokens": len(text) // 4,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0,
+            },
+        }
+
+    def count_tokens(self, params: dict) -> dict:
+        text = json.dumps(params.get("system")) + "".join(map(_content_text, params.get("messages", [])))
+        return {"input_tokens": len(text) // 4}
+
+    def _result(self, custom_id: str, params: dict) -> dict:
+        with self.lock:
+            first_time = custom_id not in self.seen
+            order = self.seen.setdefault(custom_id, len(self.seen))
+        if first_time and order < self.fail_first:
+            return {
+                "type": "errored",
+                "error": {"type": "error", "error": {"type": "overloaded_error", "message": "Stand-in failure"}},
+            }
+        if first_time and order < self.fail_first + self.invalid_first:
+            return {"type": "succeeded", "message": self.message(params, text="{not valid json")}
+        return {"type": "succeeded", "message": self.message(params)}
+
+    def create_batch(self, body: dict, base_url: str) -> dict:
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        now = time.time()
+        results = [
+            {"custom_id": request["custom_id"], "result": self._result(request["custom_id"], request["params"])}
+            for request in body["requests"]
+        ]
+        with self.lock:
+            self.batches[batch_id] = {"created": now, "results": results, "base_url": base_url}
+        return self.batch(batch_id)
+
+    def batch(self, batch_id: str) -> Optional[dict]:
+        with self.lock:
+            state = self.batches.get(batch_id)
+        if state is None:
+            return None
+
+        ended = time.time() >= state["created"] + self.batch_seconds
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        for entry in state["results"]:
+            counts[entry["result"]["type"] if ended else "processing"] += 1
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts,
+            "created_at": _timestamp(state["created"]),
+            "expires_at": _timestamp(state["created"] + timedelta(days=1).total_seconds()),
+            "ended_at": _timestamp(state["created"] + self.batch_seconds) if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{state['base_url']}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def results(self, batch_id: str) -> Optional[str]:
+        with self.lock:
+            state = self.batches.get(batch_id)
+        if state is None:
+            return None
+        return "".join(json.dumps(entry) + "\n" for entry in state["results"])
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    api: StandinAPI  # Set on the per-server subclass
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send(
+        self,
+        status: int,
+        body: str,
+        content_type: str = "application/json",
+        headers: Optional[dict[str, str]] = None,
+    ) -> None:
+        data = body.encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("request-id", f"req_{uuid.uuid4().hex[:24]}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status: int, value: Any) -> None:
+        self._send(status, json.dumps(value))
+
+    def _not_found(self) -> None:
+        self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def _send_events(self, message: dict) -> None:
+        """Send a message as a server-sent event stream, the way stream=True requests get it."""
+        text = "".join(block["text"] for block in message["content"] if block["type"] == "text")
+        start = dict(message, content=[], stop_reason=None, usage=dict(message["usage"], output_tokens=0))
+        events = [
+            ("message_start", {"type": "message_start", "message": start}),
+            ("content_block_start", {"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}}),
+        ]
+        for i in range(0, len(text), 64):
+            events.append(("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                   "delta": {"type": "text_delta", "text": text[i:i + 64]}}))
+        events += [
+            ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            ("message_delta", {"type": "message_delta",
+                               "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                               "usage": {"output_tokens": message["usage"]["output_tokens"]}}),
+            ("message_stop", {"type": "message_stop"}),
+        ]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for event, data in events:
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client aborted the stream
+        self.close_connection = True
+
+    def _base_url(self) -> str:
+        return f"http://{self.headers.get('Host', '%s:%d' % self.server.server_address[:2])}"
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        path = self.path.split("?")[0]
+        if path == "/v1/messages" and self.api.overloaded():
+            error = {"type": "error", "error": {"type": "overloaded_error", "message": "Stand-in overload"}}
+            self._send(529, json.dumps(error), headers={"retry-after": "1"})
+        elif path == "/v1/messages" and body.get("stream"):
+            self._send_events(self.api.message(body))
+        elif path == "/v1/messages":
+            self._send_json(200, self.api.message(body))
+        elif path == "/v1/messages/count_tokens":
+            self._send_json(200, self.api.count_tokens(body))
+        elif path == "/v1/messages/batches":
+            self._send_json(200, self.api.create_batch(body, self._base_url()))
+        else:
+            self._not_found()
+
+    def do_GET(self) -> None:
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts[:3] != ["v1", "messages", "batches"] or len(parts) not in (4, 5):
+            return self._not_found()
+        if len(parts) == 4:
+            batch = self.api.batch(parts[3])
+            return self._send_json(200, batch) if batch else self._not_found()
+        if parts[4] == "results":
+            results = self.api.results(parts[3])
+            return self._send(200, results, "application/x-jsonl") if results is not None else self._not_found()
+        self._not_found()
+
+
+def make_server(api: Optional[StandinAPI] = None, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Build a stand-in server. Port 0 picks a free port."""
+    handler = type("Handler", (StandinHandler,), {"api": api or StandinAPI()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_standin(api: Optional[StandinAPI] = None, host: str = "127.0.0.1", port: int = 0):
+    """Serve the stand-in on a background thread. Returns (server, base_url); call server.shutdown() when done."""
+    server = make_server(api, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Anthropic Messages and Batches APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-first", type=int, default=0, help="Error this many requests on first sight")
+    parser.add_argument("--invalid-first", type=int, default=0, help="Return invalid JSON for this many more")
+    parser.add_argument("--batch-seconds", type=float, default=1.0, help="How long batches stay in progress")
+    parser.add_argument("--fixtures", type=Path, help="Answer with responses recorded in this directory")
+    parser.add_argument("--latency", type=float, help="Seconds per replayed response (default: as recorded)")
+    parser.add_argument("--overload-first", type=int, default=0, help="Answer this many requests with 529")
+    args = parser.parse_args()
+
+    replay = ReplayClient(args.fixtures, latency=args.latency, strict=False) if args.fixtures else None
+    api = StandinAPI(args.fail_first, args.invalid_first, args.batch_seconds, replay, args.overload_first)
+    server = make_server(api, args.host, args.port)
+    print(f"Stand-in API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Shared on-disk cache: sharded, optionally compressed, integrity-checked,
+written atomically and bounded in size
+"""
+
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+try:
+    import zstandard
+except ImportError:  # Optional - gzip is always available
+    zstandard = None
+
+# Entry layout: MAGIC, one codec byte, three pad bytes, sha256 of the payload
+# (before compression), then the payload. Raw entries can be mmapped directly.
+MAGIC = b"AOM1"
+HEADER_SIZE = len(MAGIC) + 4 + 32
+CODECS = {None: 0, "gzip": 1, "zstd": 2}
+CODEC_NAMES = {value: name for name, value in CODECS.items()}
+SAFE_KEY = re.compile(r"[A-Za-z0-9_.-]{1,100}")
+
+
+def account_id(session_cookie: str) -> str:
+    """Stable, non-reversible shard name for an AoC account."""
+    return hashlib.sha256(session_cookie.encode()).hexdigest()[:12]
+
+
+class CacheStore:
+    """
+    A directory of cache entries under root/<shard...>/.
+
+    Writes go to a temp file that is renamed into place, so concurrent
+    readers see either the old entry or the new one, never a torn file.
+    Every entry carries a sha256 of its content; corrupt entries read as
+    misses and are removed. With `max_bytes`, the least recently used
+    entries are evicted after each write.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        shard: Iterable[str] = (),
+        compression: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        if compression not in CODECS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        self.root = Path(root).joinpath(*shard)
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key: str) -> Path:
+        """File holding an entry. Readable keys are kept as-is, anything else is hashed."""
+        if SAFE_KEY.fullmatch(key):
+            name = key
+        else:
+            name = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return self.root / f"{name}.cache"
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == "gzip":
+            return gzip.compress(data, mtime=0)
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor().compress(data)
+        return data
+
+    @staticmethod
+    def _decompress(codec: Optional[str], data: bytes) -> bytes:
+        if codec == "gzip":
+            return gzip.decompress(data)
+        if codec == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd entry found but 'zstandard' is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        try:
+            if raw[:len(MAGIC)] != MAGIC:
+                raise ValueError("bad magic")
+            codec = CODEC_NAMES[raw[len(MAGIC)]]
+            data = self._decompress(codec, raw[HEADER_SIZE:])
+            if hashlib.sha256(data).digest() != raw[HEADER_SIZE - 32:HEADER_SIZE]:
+                raise ValueError("checksum mismatch")
+        except Exception:
+            # Corrupt entry (bad header, undecodable payload, checksum) - drop it and report a miss
+            path.unlink(missing_ok=True)
+            return None
+
+        self._touch(path)
+        return data
+
+    def _touch(self, path: Path) -> None:
+        """Mark an entry as recently used (mtime drives LRU eviction)."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return an entry's content, or None if missing or corrupt."""
+        return self._read(key)
+
+    def get_text(self, key: str) -> Optional[str]:
+        data = self._read(key)
+        return data.decode() if data is not None else None
+
+    def get_json(self, key: str) -> Optional[Any]:
+        data = self._read(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            return None
+
+    def put(self, key: str, data: bytes | str) -> Path:
+        """Atomically write an entry. Returns its path."""
+        if isinstance(data, str):
+            data = data.encode()
+        header = MAGIC + bytes([CODECS[self.compression], 0, 0, 0]) + hashlib.sha256(data).digest()
+
+        path = self.path_for(key)
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(self._compress(data))
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        if self.max_bytes is not None:
+            self._evict(keep=path)
+        return path
+
+    def put_json(self, key: str, value: Any) -> Path:
+        return self.put(key, json.dumps(value))
+
+    def delete(self, key: str) -> None:
+        self.path_for(key).unlink(missing_ok=True)
+
+    def map(self, key: str) -> Optional[tuple[mmap.mmap, memoryview]]:
+        """
+        Memory-map an uncompressed entry after verifying its checksum.
+        Returns (mapping, view of the content), or None if missing or corrupt.
+        Release the view before closing the mapping.
+        """
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if (
+            len(mapping) < HEADER_SIZE
+            or mapping[:len(MAGIC)] != MAGIC
+            or mapping[len(MAGIC)] != CODECS[None]
+            or hashlib.sha256(memoryview(mapping)[HEADER_SIZE:]).digest()
+            != mapping[HEADER_SIZE - 32:HEADER_SIZE]
+        ):
+            mapping.close()
+            path.unlink(missing_ok=True)
+            return None
+
+        self._touch(path)
+        return mapping, memoryview(mapping)[HEADER_SIZE:]
+
+    def _evict(self, keep: Path) -> None:
+        """Delete least recently used entries until the store fits in max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.root):
+            if not entry.is_file() or not entry.name.endswith(".cache"):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == str(keep):
+                continue
+            Path(path).unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,200 @@
+"""
+Hedged requests: race a second copy of a slow request and keep the first good answer
+
+A request that hasn't produced its first token (or finished) within a
+percentile of recent latencies gets an identical backup request. Whichever
+attempt is accepted first wins and the other is told to stop. Latencies are
+kept in a CacheStore entry so thresholds carry over between runs.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from .cache import CacheStore
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistory:
+    """Recent latency samples per label, persisted in a CacheStore entry."""
+
+    def __init__(self, store: CacheStore, key: str = "latency-history", window: int = 200):
+        self.store = store
+        self.key = key
+        self.window = window
+        self._lock = threading.Lock()
+        self.samples: dict[str, list[float]] = self.store.get_json(key) or {}
+
+    def record(self, label: str, seconds: float) -> None:
+        with self._lock:
+            samples = self.samples.setdefault(label, [])
+            samples.append(round(seconds, 3))
+            del samples[:-self.window]
+
+    def percentile(self, label: str, fraction: float, min_samples: int = 5) -> Optional[float]:
+        """The `fraction` quantile of a label's samples, or None with too little history."""
+        with self._lock:
+            samples = sorted(self.samples.get(label, []))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def save(self) -> None:
+        with self._lock:
+            self.store.put_json(self.key, self.samples)
+
+
+class Attempt:
+    """
+    One in-flight copy of a request: its cancel flag, when its first token
+    arrived, and how to abort it from another thread (see on_cancel).
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.cancel = threading.Event()
+        self.first_token: Optional[float] = None
+        self._lock = threading.Lock()
+        self._closers: list[Callable[[], None]] = []
+
+    def mark_first_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.monotonic() - self.started
+
+    def on_cancel(self, close: Callable[[], None]) -> None:
+        """
+        Call `close` (e.g. a stream's close method) when the attempt is
+        cancelled, or right away if it already is. A request blocked waiting
+        for its first token only notices cancellation this way.
+        """
+        with self._lock:
+            if not self.cancel.is_set():
+                self._closers.append(close)
+                return
+        close()
+
+    def stop(self) -> None:
+        """Cancel the attempt and close whatever it registered with on_cancel."""
+        with self._lock:
+            if self.cancel.is_set():
+                return
+            self.cancel.set()
+            closers, self._closers = self._closers, []
+        for close in closers:
+            try:
+                close()
+            except Exception as e:
+                logger.debug(f"Closing a cancelled attempt failed: {e}")
+
+
+class Hedger:
+    """
+    Runs `request(attempt)` and, if it is slower than the `fraction`
+    percentile of recent first-token or total latencies for `label`, one
+    backup copy. `request` must watch `attempt.cancel`, register a way to
+    abort itself with `attempt.on_cancel()` and call
+    `attempt.mark_first_token()`. The first result `accept` approves wins
+    and the other copy is closed; if none is approved, the first result that
+    completed is returned. With record=False the attempts' latencies are
+    left out of the history (e.g. for a stand-in whose timings mean nothing).
+    """
+
+    def __init__(self, history: LatencyHistory, fraction: float = 0.9):
+        self.history = history
+        self.fraction = fraction
+
+    def _deadline(self, label: str, attempt: Attempt) -> Optional[float]:
+        """Monotonic time at which `attempt` counts as slow, if there's enough history."""
+        if attempt.first_token is None:
+            threshold = self.history.percentile(f"{label}:first_token", self.fraction)
+        else:
+            threshold = self.history.percentile(f"{label}:total", self.fraction)
+        return attempt.started + threshold if threshold is not None else None
+
+    def run(
+        self,
+        label: str,
+        request: Callable[[Attempt], str],
+        accept: Callable[[str], bool],
+        record: bool = True,
+    ) -> str:
+        attempts: dict[Future, Attempt] = {}
+        fallback: Optional[str] = None
+        last_error: Optional[BaseException] = None
+
+        def launch() -> Future:
+            attempt = Attempt(time.monotonic())
+            future = pool.submit(request, attempt)
+            attempts[future] = attempt
+            return future
+
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            launch()
+            primary = next(iter(attempts.values()))
+            pending = set(attempts)
+            while pending:
+                deadline = self._deadline(label, primary) if len(attempts) == 1 else None
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    attempt = attempts[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if record:
+                        self._record(label, attempt)
+                    if accept(result):
+                        for other_future, other in attempts.items():
+                            if not other_future.done():
+                                other.stop()
+                                if record:
+                                    self._record_cancelled(label, other)
+                        if len(attempts) > 1:
+                            winner = "backup" if attempt is not primary else "original"
+                            logger.info(f"  Hedged request won by the {winner}")
+                        return result
+                    if fallback is None:
+                        fallback = result
+
+                if not done and len(attempts) == 1:
+                    # The first token may have arrived meanwhile, moving the deadline out
+                    deadline = self._deadline(label, primary)
+                    if deadline is None or time.monotonic() < deadline:
+                        continue
+                    waited = time.monotonic() - primary.started
+                    stage = "first token" if primary.first_token is None else "completion"
+                    logger.info(f"  No {stage} after {waited:.1f}s - sending a hedged request")
+                    pending.add(launch())  # Even if it has finished already, its result is collected next pass
+        finally:
+            for attempt in attempts.values():
+                attempt.stop()
+            pool.shutdown(wait=False)
+            if record:
+                self.history.save()
+
+        if fallback is not None:
+            return fallback
+        raise last_error
+
+    def _record(self, label: str, attempt: Attempt) -> None:
+        if attempt.first_token is not None:
+            self.history.record(f"{label}:first_token", attempt.first_token)
+        self.history.record(f"{label}:total", time.monotonic() - attempt.started)
+
+    def _record_cancelled(self, label: str, attempt: Attempt) -> None:
+        """
+        A hedged loser took at least as long as it had been running. Leaving
+        it out would bias the percentiles, and so the hedge deadline, low.
+        """
+        elapsed = time.monotonic() - attempt.started
+        self.history.record(
+            f"{label}:first_token", attempt.first_token if attempt.first_token is not None else elapsed
+        )
+        self.history.record(f"{label}:total", elapsed)
@@ -0,0 +1,308 @@
+"""
+Fast, streaming extraction of the few nodes we need from AoC pages
+
+BeautifulSoup builds a full tree of every page just so we can read the
+first <h2>, the article.day-desc blocks and the calendar links. The
+extractors here make a single streaming pass that only materializes
+those nodes, and produce output byte-identical to the BeautifulSoup
+path (`str(tag)` and `tag.get_text(separator="\\n", strip=True)`).
+
+Anything outside the subset of HTML they reproduce faithfully raises
+UnsupportedMarkup, and callers fall back to BeautifulSoup.
+"""
+
+import re
+from dataclasses import dataclass, field
+from html import unescape
+from html.entities import name2codepoint
+from html.parser import HTMLParser
+from typing import Optional
+
+# Elements BeautifulSoup serializes as <tag/>
+VOID_ELEMENTS = {
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+    "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+    "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+}
+
+# Elements whose strings BeautifulSoup leaves out of get_text()
+SPECIAL_STRING_ELEMENTS = {"script", "style", "template", "rt", "rp"}
+
+# Elements inside which BeautifulSoup keeps whitespace-only strings as-is
+PRESERVE_WHITESPACE_ELEMENTS = {"pre", "textarea"}
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+DAY_LINK = re.compile(r"/day/(\d+)")
+CHARREF = re.compile(r"&(?:#(\d+)|#[xX]([0-9a-fA-F]+)|([A-Za-z][A-Za-z0-9]*))(;?)")
+
+
+class UnsupportedMarkup(ValueError):
+    """The page uses markup the fast path does not reproduce exactly."""
+
+
+def _escape(text: str) -> str:
+    """Minimal entity substitution, as BeautifulSoup's default formatter does."""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _unescape(text: str) -> str:
+    """
+    Decode character references, refusing the ones where html.parser and
+    BeautifulSoup disagree (unknown names, missing semicolons, C1 controls).
+    """
+    if "&" not in text:
+        return text
+    for match in CHARREF.finditer(text):
+        decimal, hexadecimal, name, semicolon = match.groups()
+        if name is not None:
+            if name not in name2codepoint or not semicolon:
+                raise UnsupportedMarkup(f"ambiguous entity reference &{name}")
+            continue
+        codepoint = int(decimal) if decimal is not None else int(hexadecimal, 16)
+        if not semicolon or not (0x20 <= codepoint < 0x7F or 0xA0 <= codepoint <= 0x10FFFF):
+            raise UnsupportedMarkup(f"ambiguous character reference {match.group(0)}")
+    return unescape(text)
+
+
+def _quoted(value: str) -> str:
+    """Quote an attribute value the way BeautifulSoup does."""
+    value = _escape(value)
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return '"' + value.replace('"', "&quot;") + '"'
+
+
+def _classes(attrs: list[tuple[str, Optional[str]]]) -> list[str]:
+    for key, value in attrs:
+        if key == "class" and value:
+            return value.split()
+    return []
+
+
+@dataclass
+class PuzzlePage:
+    """The parts of a puzzle page the client needs."""
+    heading: Optional[str] = None  # Text of the first <h2>
+    articles: list[tuple[str, str]] = field(default_factory=list)  # (html, text) per article.day-desc
+
+
+# One pass over the page finds every markup token; text is whatever lies between.
+# Anything that looks like markup but isn't matched by a specific branch hits the
+# final bare "<" and is rejected rather than guessed at.
+TOKEN = re.compile(
+    r"<!--(?P<comment>.*?)-->"
+    r"|<(?P<raw>script|style)\b[^>]*>.*?</(?P=raw)\s*>"
+    r"|<!(?P<decl>[^>]*)>"
+    r"|<\?(?P<pi>[^>]*)>"
+    r"|</(?P<end>[a-zA-Z][^\s/>]*)\s*>"
+    r"|<(?P<start>[a-zA-Z][^\s/>]*)"
+    r"(?P<attrs>(?:\s+[^\s/>\"'=]+(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s\"'>]+))?)*)"
+    r"\s*(?P<selfclose>/?)>"
+    r"|<",
+    re.DOTALL | re.IGNORECASE,
+)
+ATTRIBUTE = re.compile(r"([^\s/>\"'=]+)(?:\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s\"'>]+))?")
+
+
+def _parse_attrs(raw: str) -> list[tuple[str, Optional[str]]]:
+    """Split an attribute string the way html.parser does."""
+    attrs = []
+    for match in ATTRIBUTE.finditer(raw):
+        name, value = match.group(1).lower(), match.group(2)
+        if value is not None:
+            if value[:1] in ("'", '"'):
+                value = value[1:-1]
+            value = _unescape(value)
+        attrs.append((name, value))
+    return attrs
+
+
+class _PuzzlePageExtractor:
+    """
+    Tokenizes the page with one regex and keeps only the first <h2> text and
+    the article.day-desc subtrees. Handlers mirror html.parser's callbacks.
+    """
+
+    def __init__(self):
+        self.page = PuzzlePage()
+        self._heading_parts: Optional[list[str]] = None
+        self._data: list[str] = []
+        # Open elements inside the current article (article itself first)
+        self._stack: list[str] = []
+        self._html: list[str] = []
+        self._strings: list[str] = []
+
+    def run(self, html: str) -> PuzzlePage:
+        pos = 0
+        for match in TOKEN.finditer(html):
+            if match.start() > pos:
+                self.handle_data(html[pos:match.start()])
+            pos = match.end()
+
+            if match.group("start"):
+                tag = match.group("start").lower()
+                attrs = _parse_attrs(match.group("attrs"))
+                if match.group("selfclose"):
+                    self.handle_startendtag(tag, attrs)
+                else:
+                    self.handle_starttag(tag, attrs)
+            elif match.group("end"):
+                self.handle_endtag(match.group("end").lower())
+            elif match.group("comment") is not None:
+                self.handle_comment(match.group("comment"))
+            elif match.group("raw"):
+                self.handle_raw(match.group("raw").lower())
+            elif match.group("decl") is not None or match.group("pi") is not None:
+                self.handle_decl()
+            else:
+                raise UnsupportedMarkup(f"stray '<' at offset {match.start()}")
+
+        if pos < len(html):
+            self.handle_data(html[pos:])
+        self._flush()
+        if self._stack:
+            raise UnsupportedMarkup("unterminated article")
+        return self.page
+
+    def _collecting(self) -> bool:
+        return bool(self._stack) or self._heading_parts is not None
+
+    def _flush(self) -> None:
+        """Close off the current text node, like BeautifulSoup's endData."""
+        if not self._data:
+            return
+        text = _unescape("".join(self._data))
+        self._data = []
+        if self._heading_parts is not None:
+            self._heading_parts.append(text)
+        if self._stack:
+            if not PRESERVE_WHITESPACE_ELEMENTS.intersection(self._stack) and not text.strip(ASCII_SPACES):
+                # BeautifulSoup collapses whitespace-only strings
+                text = "\n" if "\n" in text else " "
+            self._html.append(_escape(text))
+            stripped = text.strip()
+            if stripped:
+                self._strings.append(stripped)
+
+    def _start_tag_html(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> str:
+        values: dict[str, str] = {}
+        for key, value in attrs:
+            if key in values:
+                raise UnsupportedMarkup(f"duplicate attribute {key!r}")
+            value = "" if value is None else value
+            if key == "class":
+                value = " ".join(value.split())
+            values[key] = value
+        rendered = "".join(f" {key}={_quoted(values[key])}" for key in sorted(values))
+        return f"<{tag}{rendered}{'/' if tag in VOID_ELEMENTS else ''}>"
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag == "h2" and self.page.heading is None and self._heading_parts is None:
+            self._heading_parts = []
+
+        if not self._stack:
+            if tag == "article" and "day-desc" in _classes(attrs):
+                self._stack = ["article"]
+                self._html = [self._start_tag_html(tag, attrs)]
+                self._strings = []
+            return
+
+        if tag in SPECIAL_STRING_ELEMENTS or tag == "article":
+            raise UnsupportedMarkup(f"<{tag}> inside article")
+        self._html.append(self._start_tag_html(tag, attrs))
+        if tag not in VOID_ELEMENTS:
+            self._stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag == "h2" and self._heading_parts is not None:
+            self.page.heading = "".join(self._heading_parts)
+            self._heading_parts = None
+
+        if not self._stack or tag in VOID_ELEMENTS:
+            return
+        if tag not in self._stack:
+            raise UnsupportedMarkup(f"unmatched </{tag}> inside article")
+
+        # Closing a tag implicitly closes everything opened inside it
+        while self._stack:
+            name = self._stack.pop()
+            self._html.append(f"</{name}>")
+            if name == tag:
+                break
+
+        if not self._stack:
+            self.page.articles.append(("".join(self._html), "\n".join(self._strings)))
+
+    def handle_data(self, data):
+        # Text outside the heading and articles is never looked at
+        if self._collecting():
+            self._data.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+        if self._stack:
+            self._html.append(f"<!--{data}-->")
+
+    def handle_raw(self, tag):
+        if self._collecting():
+            raise UnsupportedMarkup(f"<{tag}> inside extracted content")
+
+    def handle_decl(self):
+        if self._collecting():
+            raise UnsupportedMarkup("declaration inside extracted content")
+
+
+class _CalendarParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.calendar_days: list[int] = []  # From a.calendar-day links
+        self.pre_days: list[int] = []  # From links inside pre.calendar
+        self._pre_depth = 0  # Nesting depth of <pre> while inside pre.calendar
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "pre":
+            if self._pre_depth or "calendar" in _classes(attrs):
+                self._pre_depth += 1
+            return
+        if tag != "a":
+            return
+
+        href = next((value or "" for key, value in attrs if key == "href"), "")
+        match = DAY_LINK.search(href)
+        if not match:
+            return
+        if "calendar-day" in _classes(attrs):
+            self.calendar_days.append(int(match.group(1)))
+        if self._pre_depth:
+            self.pre_days.append(int(match.group(1)))
+
+    def handle_endtag(self, tag):
+        if tag == "pre" and self._pre_depth:
+            self._pre_depth -= 1
+
+
+def extract_puzzle_page(html: str) -> PuzzlePage:
+    """Pull the first <h2> and every article.day-desc out of a puzzle page."""
+    return _PuzzlePageExtractor().run(html)
+
+
+def extract_calendar_days(html: str) -> list[int]:
+    """Return the unlocked days linked from a calendar page."""
+    parser = _CalendarParser()
+    parser.feed(html)
+    parser.close()
+
+    days = list(parser.calendar_days)
+    for day in parser.pre_days:
+        if day not in days:
+            days.append(day)
+    return sorted(days)
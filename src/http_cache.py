@@ -0,0 +1,59 @@
+"""
+Persistent HTTP response cache with conditional-GET validators
+"""
+
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Optional
+
+from .cache import CacheStore
+
+
+@dataclass
+class CachedResponse:
+    """A cached page body plus the validators needed to revalidate it."""
+    url: str
+    body: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+    parsed: Optional[dict[str, Any]] = None  # Parse results, reused while the body is unchanged
+
+
+class HTTPCache:
+    """Stores responses in a CacheStore, one entry per URL."""
+
+    def __init__(self, store: CacheStore):
+        self.store = store
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for a URL, if any."""
+        data = self.store.get_json(url)
+        if data is None:
+            return None
+        try:
+            return CachedResponse(**data)
+        except TypeError:
+            # Outdated entry - treat as a miss
+            return None
+
+    def put(self, entry: CachedResponse) -> None:
+        """Store a response."""
+        self.store.put_json(entry.url, asdict(entry))
+
+    def conditional_headers(self, entry: Optional[CachedResponse]) -> dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for a cached entry."""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def refresh(self, entry: CachedResponse) -> CachedResponse:
+        """Mark an entry as revalidated (server answered 304)."""
+        entry.fetched_at = time.time()
+        self.put(entry)
+        return entry
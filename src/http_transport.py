@@ -0,0 +1,102 @@
+"""
+Configured HTTP transport: pooled keep-alive connections, automatic retries
+of connection errors with backoff, compression and per-request timing
+
+Throttled (429) and transient 5xx responses are not retried here: each retry
+is another request to the server, so callers retry them through their rate
+limiter (see RETRY_STATUSES and retry_delay).
+"""
+
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass
+class RequestTiming:
+    method: str
+    url: str
+    status: int
+    seconds: float  # Total time including reading the body
+    bytes: Optional[int]  # Body size on the wire (before decompression); None if unknown for a streamed body
+
+
+class TimedSession(requests.Session):
+    """
+    requests.Session that applies default (connect, read) timeouts and records
+    how long each request took. The most recent timings are kept in `timings`.
+    """
+
+    def __init__(self, timeout: tuple[float, float] = (5.0, 30.0), history: int = 200):
+        super().__init__()
+        self.timeout = timeout
+        self.timings: deque[RequestTiming] = deque(maxlen=history)
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        response = super().request(method, url, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        if "Content-Length" in response.headers:
+            wire_bytes = int(response.headers["Content-Length"])
+        elif not kwargs.get("stream"):
+            wire_bytes = len(response.content)  # Already read
+        else:
+            wire_bytes = None  # Reading it here would consume the stream the caller asked for
+        timing = RequestTiming(method.upper(), url, response.status_code, elapsed, wire_bytes)
+        self.timings.append(timing)
+        logger.debug(f"{timing.method} {url} -> {timing.status} in {elapsed * 1000:.0f}ms ({wire_bytes if wire_bytes is not None else '?'} bytes)")
+        return response
+
+
+def build_session(
+    pool_size: int = 10,
+    retries: int = 3,
+    backoff_factor: float = 0.5,
+    timeout: tuple[float, float] = (5.0, 30.0),
+) -> TimedSession:
+    """
+    Build a session with a sized keep-alive pool and retries on connection
+    and read errors. Only idempotent methods are retried (answer submissions
+    are POSTs and are never replayed). Error statuses come straight back to
+    the caller; see RETRY_STATUSES.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=0,
+        backoff_factor=backoff_factor,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,  # Hand the final response back so raise_for_status reports it
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = TimedSession(timeout=timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def retry_delay(response: requests.Response, attempt: int, backoff: float = 1.0, max_backoff: float = 60.0) -> float:
+    """Seconds before retrying a RETRY_STATUSES response: its Retry-After, else jittered exponential backoff."""
+    value = response.headers.get("Retry-After")
+    if value is not None:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass  # HTTP-date form - fall back to our own backoff
+    return random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
@@ -0,0 +1,134 @@
+"""
+Incremental JSON scanning for streamed model output
+
+The scanner is fed text as it arrives and reports each object or array as
+soon as its closing bracket is seen, together with its path from the root
+(e.g. ("levels", "level_1")). It only tracks structure - values are parsed
+with json.loads once they are complete - so it stays cheap per chunk.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Optional, Union
+
+# Next character that can change structure outside / inside a string
+STRUCTURE = re.compile(r'[{}\[\],"]')
+STRING_END = re.compile(r'["\\]')
+
+# Text allowed before the root object: whitespace and a markdown fence
+MAX_PREAMBLE = 200
+
+PathKey = Union[str, int]
+
+
+class StreamStructureError(ValueError):
+    """The streamed text can no longer become the expected JSON document."""
+
+
+@dataclass
+class _Frame:
+    kind: str  # "{" or "["
+    start: int  # Offset of the opening bracket
+    key: Optional[PathKey] = None  # Key (object) or index (array) of the current member
+    expecting_key: bool = True
+
+
+class JSONStreamScanner:
+    """
+    Tracks the structure of a JSON document fed to it in pieces.
+
+    feed() returns (path, raw_text) for every container closed by the new
+    text, at most `max_depth` levels below the root (the root itself has
+    depth 0). Raises StreamStructureError on mismatched brackets or when no
+    root object starts within the first MAX_PREAMBLE characters.
+    """
+
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.buffer = ""
+        self.pos = 0
+        self.stack: list[_Frame] = []
+        self.root_start: Optional[int] = None
+        self.done = False
+        self._in_string = False
+        self._string_start = 0
+
+    @property
+    def path(self) -> tuple[PathKey, ...]:
+        """Path of the container currently being read."""
+        return tuple(frame.key for frame in self.stack[:-1])
+
+    @property
+    def in_string(self) -> bool:
+        """True if the text so far stops inside a string (key or value)."""
+        return self._in_string
+
+    def feed(self, text: str) -> list[tuple[tuple[PathKey, ...], str]]:
+        self.buffer += text
+        closed = []
+        if self.done:
+            return closed
+
+        if self.root_start is None:
+            start = self.buffer.find("{", self.pos)
+            if start == -1:
+                if len(self.buffer) > MAX_PREAMBLE:
+                    raise StreamStructureError("No JSON object found in response")
+                return closed
+            self.root_start = start
+            self.stack.append(_Frame("{", start))
+            self.pos = start + 1
+
+        buffer = self.buffer
+        pos = self.pos
+        while not self.done:
+            if self._in_string:
+                match = STRING_END.search(buffer, pos)
+                if match is None:
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        break  # Escaped character hasn't arrived yet
+                    pos = match.end() + 1
+                    continue
+                pos = match.end()
+                self._in_string = False
+                frame = self.stack[-1]
+                if frame.kind == "{" and frame.expecting_key:
+                    frame.key = json.loads(buffer[self._string_start:pos])
+                    frame.expecting_key = False
+                continue
+
+            match = STRUCTURE.search(buffer, pos)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.end()
+            frame = self.stack[-1]
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = match.start()
+            elif char == ",":
+                if frame.kind == "{":
+                    frame.expecting_key = True
+                else:
+                    frame.key += 1
+            elif char in "{[":
+                self.stack.append(_Frame(char, match.start(), key=0 if char == "[" else None))
+            else:
+                expected = "{" if char == "}" else "["
+                if frame.kind != expected:
+                    raise StreamStructureError(
+                        f"Mismatched '{char}' at {'/'.join(map(str, self.path)) or 'root'}"
+                    )
+                path = self.path
+                self.stack.pop()
+                if len(path) <= self.max_depth:
+                    closed.append((path, buffer[frame.start:pos]))
+                if not self.stack:
+                    self.done = True
+
+        self.pos = pos
+        return closed
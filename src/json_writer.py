@@ -0,0 +1,84 @@
+"""
+Indented JSON output without the pure-Python encoder
+
+json.dumps(value, indent=2) can't use the C encoder (it only handles compact
+output), so every scenario written to disk or S3 goes through the generic
+Python one: isinstance chains, generator frames and a marker dict for cycle
+detection per container. dumps_indented() produces byte-identical text with
+one recursive function over the plain types a scenario dict contains, using
+the C string escaper.
+"""
+
+from json.encoder import encode_basestring_ascii
+from typing import Any
+
+_CONSTANTS = {True: "true", False: "false", None: "null"}
+
+
+def _float(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "Infinity" if value > 0 else "-Infinity"
+    return float.__repr__(value)
+
+
+def _key(key: Any) -> str:
+    """A dict key as json.dumps writes it (keys are always strings in JSON)."""
+    if isinstance(key, str):
+        return encode_basestring_ascii(key)
+    if key is True or key is False or key is None:
+        return f'"{_CONSTANTS[key]}"'
+    if isinstance(key, int):
+        return f'"{int.__repr__(key)}"'
+    if isinstance(key, float):
+        return f'"{_float(key)}"'
+    raise TypeError(f"keys must be str, int, float, bool or None, not {key.__class__.__name__}")
+
+
+def _write(value: Any, parts: list[str], newline: str, step: str) -> None:
+    # Exact-type checks first: nearly every value is a plain str, dict, list or int
+    kind = type(value)
+    if kind is str:
+        parts.append(encode_basestring_ascii(value))
+    elif kind is dict or (kind is not list and isinstance(value, dict)):
+        if not value:
+            parts.append("{}")
+            return
+        inner = newline + step
+        separator = "{" + inner
+        for key, item in value.items():
+            parts.append(separator)
+            parts.append(_key(key))
+            parts.append(": ")
+            _write(item, parts, inner, step)
+            separator = "," + inner
+        parts.append(newline + "}")
+    elif kind is list or kind is tuple or isinstance(value, (list, tuple)):
+        if not value:
+            parts.append("[]")
+            return
+        inner = newline + step
+        separator = "[" + inner
+        for item in value:
+            parts.append(separator)
+            _write(item, parts, inner, step)
+            separator = "," + inner
+        parts.append(newline + "]")
+    elif value is None or value is True or value is False:
+        parts.append(_CONSTANTS[value])
+    elif isinstance(value, str):
+        parts.append(encode_basestring_ascii(value))
+    elif isinstance(value, int):
+        parts.append(int.__repr__(value))
+    elif isinstance(value, float):
+        parts.append(_float(value))
+    else:
+        raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+def dumps_indented(value: Any, indent: int = 2) -> str:
+    """Same output as json.dumps(value, indent=indent) for JSON-compatible values."""
+    parts: list[str] = []
+    _write(value, parts, "\n", " " * indent)
+    return "".join(parts)
@@ -2,18 +2,30 @@
 Main entry point - orchestrates scenario generation from AoC puzzles
 """
 
+import asyncio
 import logging
 import os
 import sys
 import time
+from datetime import datetime
 from pathlib import Path
 
-import schedule
 from dotenv import load_dotenv
 
-from .aoc_client import AoCClient
-from .scenario_gen import ScenarioGenerator
+from .aoc_client import AoCClient, AoCPuzzle, AsyncAoCClient
+from .api_standin import is_standin_url
+from .scenario_gen import PART2_LEVELS, MultiLevelScenario, ScenarioGenerator, load_scenario
+from .replay import RecordingClient, ReplayClient
+from .routing import load_routes
 from .publisher import LocalPublisher, S3Publisher
+from .release_schedule import (
+    RELEASE_GRACE,
+    RELEASE_TZ,
+    next_unlock,
+    poll_delays,
+    released_days,
+    seconds_until,
+)
 
 # Set up logging
 logging.basicConfig(
@@ -28,18 +40,62 @@ logger = logging.getLogger(__name__)
 
 
 class AdventOfManagementServer:
-    def __init__(self, use_s3: bool = False):
+    MAX_SLEEP_CHUNK = 300  # Seconds; long sleeps are split so the clock is rechecked
+    RELEASE_POLL_TIMEOUT = 3600  # Stop polling for a new day after an hour
+    RETRY_INITIAL = 300  # Seconds before retrying released days that failed to process
+    RETRY_MAX = 3600  # Retries back off up to hourly, the old polling interval
+
+    def __init__(
+        self,
+        use_s3: bool = False,
+        parallel: bool = False,
+        stream: bool = False,
+        use_cache: bool = True,
+        batch: bool = False,
+        record_dir: Path | None = None,
+        replay_dir: Path | None = None,
+        hedge_percentile: float | None = None,
+        count_tokens: bool = False,
+        routes_file: Path | None = None,
+        output_dir: Path | None = None,
+    ):
         load_dotenv()
 
         # Validate required environment variables
         self._validate_env()
 
+        # Stand-in scenarios must never overwrite the published ones
+        base_url = os.getenv("ANTHROPIC_BASE_URL") or None
+        if is_standin_url(base_url) and (use_s3 or output_dir is None):
+            raise ValueError(
+                f"ANTHROPIC_BASE_URL points at a local stand-in ({base_url}); "
+                "publish its output with --output DIR, not to scenarios/ or S3"
+            )
+
         self.year = int(os.getenv("AOC_YEAR", "2025"))
         self.aoc = AoCClient(
             os.environ["AOC_SESSION_COOKIE"],
             year=self.year,
+            requests_per_second=float(os.getenv("AOC_REQUESTS_PER_SECOND", "1.0")),
+            burst=float(os.getenv("AOC_RATE_BURST", "4")),
+        )
+        self.generator = ScenarioGenerator(
+            os.environ["ANTHROPIC_API_KEY"],
+            use_cache=use_cache,
+            base_url=base_url,
+            max_in_flight=int(os.getenv("ANTHROPIC_MAX_IN_FLIGHT", "4")),
+            request_timeout=float(os.getenv("ANTHROPIC_TIMEOUT", "300")),
+            hedge_percentile=hedge_percentile,
+            count_tokens=count_tokens,
+            routes=load_routes(routes_file) if routes_file else None,
         )
-        self.generator = ScenarioGenerator(os.environ["ANTHROPIC_API_KEY"])
+        if replay_dir:
+            self.generator.client = ReplayClient(replay_dir)
+        elif record_dir:
+            self.generator.client = RecordingClient(self.generator.client, record_dir)
+        self.parallel = parallel  # Generate the six levels concurrently
+        self.stream = stream  # Validate levels while the response streams in
+        self.batch = batch  # Generate multi-day backfills as one Message Batch
 
         if use_s3:
             self.publisher = S3Publisher(
@@ -49,9 +105,13 @@ class AdventOfManagementServer:
                 region=os.getenv("AWS_REGION", "us-east-1"),
             )
         else:
-            self.publisher = LocalPublisher("scenarios")
+            self.publisher = LocalPublisher(output_dir or "scenarios")
 
         self.processed_days: set[int] = set()
+        self.awaiting_part2: set[int] = set()  # Published from Part 1 alone; refreshed when Part 2 unlocks
+        self.unprocessed_days: set[int] = set()  # Released but not processed; retried with backoff
+        self._retry_delay = self.RETRY_INITIAL
+        self._retry_at: float | None = None
         self._load_processed_days()
 
     def _validate_env(self) -> None:
@@ -62,15 +122,31 @@ class AdventOfManagementServer:
             raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
 
     def _load_processed_days(self) -> None:
-        """Load already processed days from publisher."""
+        """Load already processed days, and the days still waiting for Part 2, from the publisher."""
+        published_days = self.publisher.list_scenarios(self.year)
         if isinstance(self.publisher, LocalPublisher):
-            self.processed_days = set(self.publisher.list_scenarios(self.year))
+            self.processed_days = set(published_days)
             if self.processed_days:
                 logger.info(f"Found existing scenarios for days: {sorted(self.processed_days)}")
-
-    def process_day(self, day: int, force: bool = False) -> bool:
+        # Whatever the publisher, so days published from Part 1 alone are still refreshed after a restart
+        for day in published_days:
+            published = self.publisher.get_scenario(self.year, day)
+            if published and published.get("part2_included") is False:
+                self.awaiting_part2.add(day)
+        if self.awaiting_part2:
+            logger.info(f"Waiting for Part 2 on days: {sorted(self.awaiting_part2)}")
+
+    def process_day(
+        self,
+        day: int,
+        force: bool = False,
+        puzzle: AoCPuzzle | None = None,
+        scenario: MultiLevelScenario | None = None,
+    ) -> bool:
         """
         Process a single day: fetch puzzle and generate scenario.
+        A puzzle that was already fetched, or a scenario that was already
+        generated (e.g. by a batch), can be passed in to skip that step.
         Returns True if successful.
         """
         if day in self.processed_days and not force:
@@ -81,17 +157,30 @@ class AdventOfManagementServer:
 
         try:
             # Fetch puzzle
-            puzzle = self.aoc.get_puzzle(day)
+            if puzzle is None:
+                puzzle = self.aoc.get_puzzle(day)
             logger.info(f"  Fetched: {puzzle.title}")
 
             # Generate management scenario
-            logger.info("  Generating management scenario...")
-            scenario = self.generator.generate(puzzle)
+            if scenario is None:
+                logger.info("  Generating management scenario...")
+                if self.parallel:
+                    scenario = self.generator.generate_parallel(puzzle)
+                elif self.stream:
+                    scenario = self.generator.generate_streaming(puzzle)
+                else:
+                    scenario = self.generator.generate(puzzle)
             logger.info(f"  Generated: {scenario.title}")
 
             # Publish
             url = self.publisher.publish_scenario(scenario)
             logger.info(f"  Published to: {url}")
+            if isinstance(scenario, MultiLevelScenario) and not scenario.part2_included:
+                # Players get it now; the Part 2 levels are rewritten once Part 2 unlocks
+                self.awaiting_part2.add(day)
+                logger.info(f"  Published from Part 1 only; {', '.join(PART2_LEVELS)} refresh when Part 2 unlocks")
+            else:
+                self.awaiting_part2.discard(day)
 
             # Update manifest
             self.processed_days.add(day)
@@ -104,47 +193,168 @@ class AdventOfManagementServer:
             logger.exception(f"  Error processing Day {day}: {e}")
             return False
 
-    def process_new_days(self) -> None:
-        """Check for and process any new AoC days."""
+    def refresh_part2(self, day: int) -> bool:
+        """
+        Republish a day that was published from Part 1 alone, regenerating
+        only its Part 2 levels, if Part 2 has unlocked. Returns True once the
+        day no longer needs a refresh.
+        """
+        try:
+            # Part 1-only records are revalidated at most every PART1_RECHECK_SECONDS
+            puzzle = self.aoc.get_puzzle(day)
+            if not puzzle.part2_unlocked:
+                return False
+
+            published = self.publisher.get_scenario(self.year, day)
+            previous = load_scenario(published) if published is not None else None
+            # Legacy single-level scenarios have no Part 2 levels to refresh
+            if not isinstance(previous, MultiLevelScenario) or previous.part2_included:
+                self.awaiting_part2.discard(day)
+                return True
+
+            logger.info(f"Day {day}: Part 2 unlocked, refreshing {', '.join(PART2_LEVELS)}...")
+            scenario = self.generator.refresh_for_part2(puzzle, previous)
+            url = self.publisher.publish_scenario(scenario)
+            logger.info(f"  Republished to: {url}")
+            self.awaiting_part2.discard(day)
+            return True
+
+        except Exception as e:
+            logger.exception(f"  Error refreshing Day {day} for Part 2: {e}")
+            return False
+
+    def check_part2_unlocks(self) -> None:
+        """Refresh every day still waiting for Part 2."""
+        for day in sorted(self.awaiting_part2):
+            self.refresh_part2(day)
+
+    def process_new_days(self, force: bool = False) -> None:
+        """Check for and process any new AoC days (every available day with `force`)."""
         try:
             available = self.aoc.get_available_days()
             logger.info(f"Available days: {available}")
 
-            new_days = [d for d in available if d not in self.processed_days]
+            new_days = [d for d in available if force or d not in self.processed_days]
 
             if not new_days:
                 logger.info("No new days to process")
                 return
 
+            # Backfills fetch all days concurrently; the shared rate limiter keeps this polite
+            puzzles: dict[int, AoCPuzzle] = {}
+            if len(new_days) > 1:
+                try:
+                    fetched = asyncio.run(AsyncAoCClient(self.aoc).get_puzzles(sorted(new_days)))
+                    puzzles = {puzzle.day: puzzle for puzzle in fetched}
+                except Exception as e:
+                    logger.warning(f"Concurrent fetch failed ({e}), fetching days one at a time")
+
+            scenarios: dict[int, MultiLevelScenario] = {}
+            if self.batch and len(new_days) > 1:
+                for day in new_days:
+                    if day not in puzzles:
+                        puzzles[day] = self.aoc.get_puzzle(day)
+                logger.info(f"Generating {len(new_days)} days as a batch...")
+                scenarios = self.generator.generate_batch([puzzles[day] for day in sorted(new_days)])
+
             for day in sorted(new_days):
-                self.process_day(day)
-                # Delay between days to be nice to AoC
-                time.sleep(5)
+                self.process_day(day, force=force, puzzle=puzzles.get(day), scenario=scenarios.get(day))
+
+            logger.info(f"Generation usage: {self.generator.usage_summary()}")
+            for line in self.generator.route_summary():
+                logger.info(f"  {line}")
 
         except Exception as e:
             logger.exception(f"Error checking for new days: {e}")
+        finally:
+            # From the release calendar, so days that failed before the AoC calendar was read count too
+            released = released_days(datetime.now(RELEASE_TZ), self.year)
+            self.unprocessed_days = {day for day in released if day not in self.processed_days}
+
+    def retry_unprocessed(self) -> None:
+        """
+        Retry released days that failed to process (or didn't appear on the
+        calendar in time), waiting RETRY_INITIAL and then twice as long
+        after each failed retry, up to RETRY_MAX.
+        """
+        if not self.unprocessed_days:
+            self._retry_delay = self.RETRY_INITIAL
+            self._retry_at = None
+            return
+        if self._retry_at is None:
+            self._retry_at = time.monotonic() + self._retry_delay
+            logger.warning(f"Days {sorted(self.unprocessed_days)} not processed; retrying in {self._retry_delay}s")
+            return
+        if time.monotonic() < self._retry_at:
+            return
+
+        logger.info(f"Retrying unprocessed days: {sorted(self.unprocessed_days)}")
+        self.process_new_days()
+        if self.unprocessed_days:
+            self._retry_delay = min(self._retry_delay * 2, self.RETRY_MAX)
+            self._retry_at = time.monotonic() + self._retry_delay
+            logger.warning(
+                f"Days {sorted(self.unprocessed_days)} still not processed; next retry in {self._retry_delay}s"
+            )
+        else:
+            self.retry_unprocessed()  # Reset the backoff
+
+    def _sleep_until(self, moment: datetime) -> None:
+        """Sleep until a wall-clock instant, in chunks so host suspend/clock changes are tolerated."""
+        while (remaining := seconds_until(moment)) > 0:
+            time.sleep(min(remaining, self.MAX_SLEEP_CHUNK))
+            if self.awaiting_part2:
+                self.check_part2_unlocks()
+            self.retry_unprocessed()
+
+    def _wait_for_release(self, day: int) -> bool:
+        """Poll the calendar with jittered backoff until `day` appears. Returns False on timeout."""
+        deadline = time.monotonic() + self.RELEASE_POLL_TIMEOUT
+        for delay in poll_delays():
+            try:
+                if day in self.aoc.get_available_days():
+                    return True
+            except Exception as e:
+                logger.warning(f"Calendar check failed: {e}")
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+        return False
 
     def run_scheduler(self) -> None:
-        """Run as a continuous scheduler."""
+        """Run as a continuous scheduler that wakes up for each puzzle release."""
         logger.info(f"Starting Advent of Management server for {self.year}")
 
-        # Check immediately on start
+        # Catch up on anything released while we weren't running
         self.process_new_days()
 
-        # Then check every hour
-        schedule.every().hour.do(self.process_new_days)
-
-        logger.info("Scheduler running. Checking every hour for new puzzles.")
         while True:
-            schedule.run_pending()
-            time.sleep(60)
-
-    def run_once(self, day: int | None = None) -> None:
+            upcoming = next_unlock(datetime.now(RELEASE_TZ), self.year)
+            if upcoming is None:
+                logger.info(f"All {self.year} puzzles are released. Idling until restarted.")
+                while True:
+                    time.sleep(self.MAX_SLEEP_CHUNK)
+                    if self.awaiting_part2:
+                        self.check_part2_unlocks()
+                    self.retry_unprocessed()
+
+            day, unlock = upcoming
+            logger.info(f"Next puzzle: Day {day} unlocks at {unlock.isoformat()}. Sleeping until then.")
+            self._sleep_until(unlock + RELEASE_GRACE)
+
+            if self._wait_for_release(day):
+                self.process_new_days()
+            else:
+                logger.warning(f"Day {day} did not appear on the calendar; retrying with backoff")
+                self.unprocessed_days.add(day)
+            self.retry_unprocessed()
+
+    def run_once(self, day: int | None = None, force: bool = False) -> None:
         """Process a specific day or all available days once."""
         if day:
             self.process_day(day, force=True)
         else:
-            self.process_new_days()
+            self.process_new_days(force=force)
 
 
 def main():
@@ -167,22 +377,101 @@ def main():
         action="store_true",
         help="Publish to S3 instead of local files",
     )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        metavar="DIR",
+        help="Publish local scenario files to DIR instead of scenarios/ (required with a local stand-in API)",
+    )
     parser.add_argument(
         "--force",
         action="store_true",
         help="Force reprocessing even if already done",
     )
+    parser.add_argument(
+        "--refresh-part2",
+        action="store_true",
+        help="Refresh days published from Part 1 alone whose Part 2 has since unlocked, then exit",
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Generate the six career levels concurrently, each on its own model route (cheaper models for the lower levels)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream generation and retry as soon as a level is invalid",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Call the model even if an identical generation is cached",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Generate all outstanding days as one Message Batch",
+    )
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        nargs="?",
+        const=0.9,
+        metavar="PERCENTILE",
+        help="Send a backup request when generation is slower than this latency percentile (default 0.9)",
+    )
+    parser.add_argument(
+        "--count-tokens",
+        action="store_true",
+        help="Count prompt tokens with the API's count_tokens endpoint instead of estimating them",
+    )
+    parser.add_argument(
+        "--routes",
+        type=Path,
+        metavar="FILE",
+        help=(
+            "JSON overrides for the model routing table (see src/routing.py). Per-level routes "
+            "apply with --parallel; single-call generation uses the \"scenario\" route"
+        ),
+    )
+    parser.add_argument(
+        "--record",
+        type=Path,
+        metavar="DIR",
+        help="Save every model response to DIR as a replay fixture",
+    )
+    parser.add_argument(
+        "--replay",
+        type=Path,
+        metavar="DIR",
+        help="Answer model calls from fixtures recorded in DIR instead of the API",
+    )
 
     args = parser.parse_args()
 
-    server = AdventOfManagementServer(use_s3=args.s3)
+    server = AdventOfManagementServer(
+        use_s3=args.s3,
+        parallel=args.parallel,
+        stream=args.stream,
+        use_cache=not args.no_cache,
+        batch=args.batch,
+        record_dir=args.record,
+        replay_dir=args.replay,
+        hedge_percentile=args.hedge,
+        count_tokens=args.count_tokens,
+        routes_file=args.routes,
+        output_dir=args.output,
+    )
 
     if args.scheduler:
         server.run_scheduler()
+    elif args.refresh_part2:
+        server.check_part2_unlocks()
     elif args.day:
         server.process_day(args.day, force=args.force)
     else:
-        server.run_once()
+        server.run_once(force=args.force)
 
 
 if __name__ == "__main__":
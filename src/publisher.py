@@ -3,6 +3,7 @@ Uploads scenarios to S3 and manages local file storage
 """
 
 import json
+import re
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Protocol
@@ -11,11 +12,19 @@ import boto3
 from botocore.exceptions import ClientError
 
 from .scenario_gen import ManagementScenario, MultiLevelScenario
+from .schema import check_scenario
 
 # Union type for both scenario formats
 Scenario = ManagementScenario | MultiLevelScenario
 
 
+def _checked_json(scenario: Scenario) -> str:
+    """Serialize a scenario, refusing multi-level scenarios that violate the schema."""
+    if isinstance(scenario, MultiLevelScenario):
+        check_scenario(scenario.to_dict())
+    return scenario.to_json()
+
+
 class Publisher(Protocol):
     """Protocol for scenario publishers."""
 
@@ -31,6 +40,10 @@ class Publisher(Protocol):
         """Retrieve a published scenario."""
         ...
 
+    def list_scenarios(self, year: int) -> list[int]:
+        """Days with a published scenario."""
+        ...
+
 
 class LocalPublisher:
     """Publishes scenarios to local filesystem for testing."""
@@ -45,7 +58,7 @@ class LocalPublisher:
         year_path.mkdir(exist_ok=True)
 
         file_path = year_path / f"day{scenario.day}.json"
-        file_path.write_text(scenario.to_json())
+        file_path.write_text(_checked_json(scenario))
 
         return str(file_path)
 
@@ -122,7 +135,7 @@ class S3Publisher:
         self.s3.put_object(
             Bucket=self.bucket,
             Key=key,
-            Body=scenario.to_json(),
+            Body=_checked_json(scenario),
             ContentType="application/json",
             CacheControl="max-age=3600",  # 1 hour cache
         )
@@ -158,6 +171,16 @@ class S3Publisher:
                 return None
             raise
 
+    def list_scenarios(self, year: int) -> list[int]:
+        """List days with a scenario in the bucket for a year."""
+        days = []
+        for page in self.s3.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=f"{year}/day"):
+            for obj in page.get("Contents", []):
+                match = re.fullmatch(rf"{year}/day(\d+)\.json", obj["Key"])
+                if match:
+                    days.append(int(match.group(1)))
+        return sorted(days)
+
     def ensure_bucket_exists(self) -> bool:
         """Check if bucket exists, optionally create it."""
         try:
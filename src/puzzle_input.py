@@ -0,0 +1,109 @@
+"""
+Lazily loaded, memory-mapped puzzle input
+"""
+
+import mmap
+import threading
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from .cache import CacheStore
+
+
+class PuzzleInput:
+    """
+    Puzzle input backed by its on-disk cache entry.
+
+    Nothing is read (or downloaded) until the input is first used. The entry is
+    then memory-mapped, so `memoryview()` and `lines()` work on the page cache
+    directly instead of holding a private copy of the whole input.
+    """
+
+    def __init__(self, store: CacheStore, key: str, fetch: Optional[Callable[[], None]] = None):
+        self.store = store
+        self.key = key
+        self._fetch = fetch  # Writes the input into `store` when it isn't cached yet
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+
+    @property
+    def path(self) -> Path:
+        return self.store.path_for(self.key)
+
+    def __repr__(self) -> str:
+        return f"PuzzleInput({str(self.path)!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PuzzleInput):
+            return NotImplemented
+        return self.path == other.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def _mapped(self) -> memoryview:
+        """Map the cache entry on first use, fetching the input if it isn't cached."""
+        with self._lock:
+            if self._view is None:
+                mapped = self.store.map(self.key)
+                if mapped is None:
+                    if self._fetch is None:
+                        raise FileNotFoundError(f"Puzzle input not cached: {self.path}")
+                    self._fetch()
+                    mapped = self.store.map(self.key)
+                    if mapped is None:
+                        raise FileNotFoundError(f"Puzzle input could not be cached: {self.path}")
+                self._map, self._view = mapped
+            return self._view
+
+    def ensure(self) -> None:
+        """Make sure the input is cached locally, fetching it if needed."""
+        self._mapped()
+
+    def memoryview(self) -> memoryview:
+        """Zero-copy view of the raw input bytes. Release it before calling close()."""
+        return self._mapped()
+
+    def bytes(self) -> bytes:
+        """Copy of the raw input bytes."""
+        return self._mapped().tobytes()
+
+    @property
+    def text(self) -> str:
+        """The whole input decoded as UTF-8 (decoded on every access, not kept)."""
+        return self.bytes().decode()
+
+    def lines(self) -> Iterator[str]:
+        """Iterate over input lines without their trailing newline."""
+        view = self._mapped()
+        mapped = self._map
+        offset = len(mapped) - len(view)  # Content starts after the cache entry header
+        pos, size = offset, len(mapped)
+        while pos < size:
+            end = mapped.find(b"\n", pos)
+            if end == -1:
+                end = size
+            yield mapped[pos:end].decode()
+            pos = end + 1
+
+    def __iter__(self) -> Iterator[str]:
+        return self.lines()
+
+    def __len__(self) -> int:
+        """Size of the input in bytes."""
+        return len(self._mapped())
+
+    def close(self) -> None:
+        """Unmap the entry. It is mapped again on next use."""
+        with self._lock:
+            if self._view is not None:
+                self._view.release()
+                self._map.close()
+                self._view = self._map = None
+
+    def __enter__(self) -> "PuzzleInput":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,122 @@
+"""
+SQLite-backed store of parsed AoC puzzle descriptions
+"""
+
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS puzzles (
+    year INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    part2_unlocked INTEGER NOT NULL,
+    page_hash TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description_html TEXT NOT NULL,
+    description_text TEXT NOT NULL,
+    part2_description TEXT,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (year, day, part2_unlocked)
+)
+"""
+
+DESCRIPTION_FIELDS = [
+    "title",
+    "description_html",
+    "description_text",
+    "part2_unlocked",
+    "part2_description",
+]
+
+
+class PuzzleStore:
+    """
+    Parsed puzzle records keyed by (year, day, part2_unlocked).
+
+    Each record keeps the hash of the page it was parsed from, so an unchanged
+    page can be matched back to its record without parsing it again.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per operation keeps the store safe to use from worker threads
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _to_record(self, row: Optional[sqlite3.Row]) -> Optional[dict[str, Any]]:
+        if row is None:
+            return None
+        record = dict(row)
+        record["part2_unlocked"] = bool(record["part2_unlocked"])
+        return record
+
+    def get(self, year: int, day: int, part2_unlocked: bool) -> Optional[dict[str, Any]]:
+        """Return the stored record for a puzzle state, if any."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM puzzles WHERE year = ? AND day = ? AND part2_unlocked = ?",
+                (year, day, int(part2_unlocked)),
+            ).fetchone()
+        return self._to_record(row)
+
+    def get_by_hash(self, year: int, day: int, page_hash: str) -> Optional[dict[str, Any]]:
+        """Return the record parsed from a page with this hash, if any."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM puzzles WHERE year = ? AND day = ? AND page_hash = ?",
+                (year, day, page_hash),
+            ).fetchone()
+        return self._to_record(row)
+
+    def put(self, year: int, day: int, page_hash: str, description: dict[str, Any]) -> None:
+        """Store parsed description fields (see DESCRIPTION_FIELDS)."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO puzzles (
+                    year, day, part2_unlocked, page_hash, title, description_html,
+                    description_text, part2_description, stored_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    year,
+                    day,
+                    int(description["part2_unlocked"]),
+                    page_hash,
+                    description["title"],
+                    description["description_html"],
+                    description["description_text"],
+                    description["part2_description"],
+                    time.time(),
+                ),
+            )
+
+    def touch(self, year: int, day: int, part2_unlocked: bool) -> None:
+        """Mark a record as just revalidated against the live page."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE puzzles SET stored_at = ? WHERE year = ? AND day = ? AND part2_unlocked = ?",
+                (time.time(), year, day, int(part2_unlocked)),
+            )
+
+    def invalidate(self, year: int, day: int, part2_unlocked: bool) -> None:
+        """Drop a record so the next lookup goes back to the network."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM puzzles WHERE year = ? AND day = ? AND part2_unlocked = ?",
+                (year, day, int(part2_unlocked)),
+            )
+
+    @staticmethod
+    def description(record: dict[str, Any]) -> dict[str, Any]:
+        """Pick the AoCPuzzle description fields out of a record."""
+        return {name: record[name] for name in DESCRIPTION_FIELDS}
@@ -0,0 +1,83 @@
+"""
+Token-bucket rate limiting shared across threads and processes
+"""
+
+import fcntl
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens are added per second up to `burst`.
+
+    When `state_path` is given, the bucket state lives in that file and is
+    guarded by an exclusive flock, so every process on the host that points
+    at the same file draws from the same budget.
+    """
+
+    def __init__(self, rate: float, burst: float, state_path: Optional[Path] = None):
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate and burst must be positive")
+        self.rate = rate
+        self.burst = burst
+        self.state_path = Path(state_path) if state_path else None
+        self._lock = threading.Lock()
+        # In-process state, used when there is no state file
+        self._tokens = burst
+        self._updated = time.time()
+
+        if self.state_path:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            self.state_path.touch(exist_ok=True)
+
+    def _take(self, cost: float, tokens: float, updated: float) -> tuple[float, float, float]:
+        """Refill and try to take `cost` tokens. Returns (tokens, updated, wait)."""
+        now = time.time()
+        tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= cost:
+            return tokens - cost, now, 0.0
+        return tokens, now, (cost - tokens) / self.rate
+
+    def _try_acquire(self, cost: float) -> float:
+        """Attempt to take tokens once. Returns 0 on success, else seconds to wait."""
+        with self._lock:
+            if not self.state_path:
+                self._tokens, self._updated, wait = self._take(cost, self._tokens, self._updated)
+                return wait
+
+            with open(self.state_path, "r+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    try:
+                        state = json.loads(f.read() or "{}")
+                    except json.JSONDecodeError:
+                        state = {}
+                    tokens, updated, wait = self._take(
+                        cost,
+                        state.get("tokens", self.burst),
+                        state.get("updated", time.time()),
+                    )
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({"tokens": tokens, "updated": updated}))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                return wait
+
+    def acquire(self, cost: float = 1.0) -> float:
+        """Block until `cost` tokens are available. Returns total seconds waited."""
+        if cost > self.burst:
+            raise ValueError(f"cost {cost} exceeds bucket burst size {self.burst}")
+
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(cost)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
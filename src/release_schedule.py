@@ -0,0 +1,56 @@
+"""
+Advent of Code release calendar - when does the next puzzle unlock?
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+from zoneinfo import ZoneInfo
+
+# Puzzles unlock at midnight US Eastern
+RELEASE_TZ = ZoneInfo("America/New_York")
+RELEASE_GRACE = timedelta(seconds=5)  # Give AoC a moment to publish after midnight
+
+
+def season_length(year: int) -> int:
+    """Number of puzzle days in a year's event (2025 onwards has 12, not 25)."""
+    return 12 if year >= 2025 else 25
+
+
+def unlock_time(year: int, day: int) -> datetime:
+    """The instant a given day's puzzle unlocks."""
+    return datetime(year, 12, day, tzinfo=RELEASE_TZ)
+
+
+def next_unlock(now: datetime, year: int) -> Optional[tuple[int, datetime]]:
+    """
+    Return (day, unlock instant) for the first puzzle unlocking after `now`,
+    or None once every day of the season has been released.
+    """
+    for day in range(1, season_length(year) + 1):
+        unlock = unlock_time(year, day)
+        if unlock > now:
+            return day, unlock
+    return None
+
+
+def released_days(now: datetime, year: int) -> list[int]:
+    """Days of the season whose puzzle has unlocked by `now`."""
+    return [day for day in range(1, season_length(year) + 1) if unlock_time(year, day) <= now]
+
+
+def poll_delays(
+    initial: float = 2.0, factor: float = 2.0, maximum: float = 60.0, jitter: float = 0.25
+) -> Iterator[float]:
+    """Endless jittered exponential backoff, for polling until a new day shows up."""
+    delay = initial
+    while True:
+        yield delay * random.uniform(1 - jitter, 1 + jitter)
+        delay = min(delay * factor, maximum)
+
+
+def seconds_until(moment: datetime, now: Optional[datetime] = None) -> float:
+    """Seconds from `now` (default: current time) until `moment`, never negative."""
+    now = now or datetime.now(RELEASE_TZ)
+    return max(0.0, (moment - now).total_seconds())
+
@@ -0,0 +1,221 @@
+"""
+Record and replay Anthropic Messages API calls
+
+RecordingClient wraps a real client and saves every completed response as a
+JSON fixture. ReplayClient serves those fixtures back - matched by request,
+or in recorded order - with configurable latency, so ScenarioGenerator can
+be run, profiled and benchmarked without an API key.
+
+Only messages.create() and messages.stream() are covered; batches go
+through the local stand-in server (src/api_standin.py).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from anthropic.types import Message
+
+STREAM_CHUNK_CHARS = 64  # Replayed text_stream chunk size, close to real delta sizes
+
+
+class ReplayMiss(LookupError):
+    """No fixture was recorded for a request."""
+
+
+def request_key(params: dict) -> str:
+    """
+    Hash of the parts of a request that determine its response. max_tokens
+    is left out: it is planned from response history, so it varies between
+    runs, and it only decides where a response would be cut off.
+    """
+    relevant = {name: params.get(name) for name in ("model", "system", "messages")}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode()).hexdigest()
+
+
+def load_fixtures(fixtures_dir: Path) -> list[dict]:
+    """All fixtures in a directory, in the order they were recorded."""
+    fixtures = [json.loads(path.read_text()) for path in Path(fixtures_dir).glob("*.json")]
+    return sorted(fixtures, key=lambda fixture: fixture.get("recorded_at", 0))
+
+
+def _message_text(message: Message) -> str:
+    return "".join(block.text for block in message.content if block.type == "text")
+
+
+class _RecordingStream:
+    """Proxies a MessageStream and records the final message unless the stream ends in an error."""
+
+    def __init__(self, client: "RecordingClient", params: dict, manager: Any):
+        self._client = client
+        self._params = params
+        self._manager = manager
+        self._stream = None
+        self._started = 0.0
+
+    def __enter__(self) -> "_RecordingStream":
+        self._started = time.perf_counter()
+        self._stream = self._manager.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> Any:
+        if exc_type is None:
+            # Callers may stop reading once they have what they need; finish the
+            # message so it can be recorded. Streams aborted by an error aren't.
+            message = self._stream.get_final_message()
+            self._client.save(self._params, message, time.perf_counter() - self._started)
+        return self._manager.__exit__(exc_type, exc, tb)
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        return self._stream.text_stream
+
+    @property
+    def current_message_snapshot(self) -> Message:
+        return self._stream.current_message_snapshot
+
+    def get_final_message(self) -> Message:
+        return self._stream.get_final_message()
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class _RecordingMessages:
+    def __init__(self, client: "RecordingClient"):
+        self._client = client
+        self.batches = client.inner.messages.batches
+
+    def create(self, **params) -> Message:
+        started = time.perf_counter()
+        message = self._client.inner.messages.create(**params)
+        self._client.save(params, message, time.perf_counter() - started)
+        return message
+
+    def stream(self, **params) -> _RecordingStream:
+        return _RecordingStream(self._client, params, self._client.inner.messages.stream(**params))
+
+
+class RecordingClient:
+    """Drop-in for anthropic.Anthropic that saves each response under `fixtures_dir`."""
+
+    def __init__(self, inner: Any, fixtures_dir: Path):
+        self.inner = inner
+        self.fixtures_dir = Path(fixtures_dir)
+        self.fixtures_dir.mkdir(parents=True, exist_ok=True)
+        self.messages = _RecordingMessages(self)
+
+    def save(self, params: dict, message: Message, latency: float) -> Path:
+        key = request_key(params)
+        path = self.fixtures_dir / f"{key[:16]}.json"
+        fixture = {
+            "key": key,
+            "recorded_at": time.time(),
+            "latency": latency,
+            "request": params,
+            "response": message.model_dump(mode="json"),
+        }
+        path.write_text(json.dumps(fixture, indent=2))
+        return path
+
+
+class _ReplayStream:
+    """Stands in for MessageStream, yielding a recorded message's text in chunks."""
+
+    def __init__(self, message: Message, first_byte: float, chars_per_second: Optional[float]):
+        self._message = message
+        self._first_byte = first_byte
+        self._chars_per_second = chars_per_second
+        self._closed = threading.Event()
+
+    def __enter__(self) -> "_ReplayStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        # Waits end early when the stream is closed from another thread, like a dropped connection
+        if self._closed.wait(self._first_byte):
+            return
+        text = _message_text(self._message)
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            chunk = text[start:start + STREAM_CHUNK_CHARS]
+            if self._chars_per_second and self._closed.wait(len(chunk) / self._chars_per_second):
+                return
+            yield chunk
+
+    @property
+    def current_message_snapshot(self) -> Message:
+        return self._message
+
+    def get_final_message(self) -> Message:
+        return self._message
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+class _ReplayMessages:
+    def __init__(self, client: "ReplayClient"):
+        self._client = client
+
+    def create(self, **params) -> Message:
+        message, latency = self._client.lookup(params)
+        time.sleep(latency)
+        return message
+
+    def stream(self, **params) -> _ReplayStream:
+        message, latency = self._client.lookup(params)
+        return _ReplayStream(message, latency, self._client.chars_per_second)
+
+
+class ReplayClient:
+    """
+    Drop-in for anthropic.Anthropic that answers from recorded fixtures.
+
+    latency: seconds before each response (or before the first streamed
+        chunk); None replays the latency measured when recording.
+    chars_per_second: streamed output rate; None streams instantly.
+    strict: requests must match a recorded request exactly. Otherwise
+        unmatched requests get the recorded responses in order, round-robin,
+        which lets a benchmark run any corpus through any prompt.
+    """
+
+    def __init__(
+        self,
+        fixtures_dir: Path,
+        latency: Optional[float] = 0.0,
+        chars_per_second: Optional[float] = None,
+        strict: bool = True,
+    ):
+        self.fixtures = load_fixtures(fixtures_dir)
+        if not self.fixtures:
+            raise FileNotFoundError(f"No replay fixtures in {fixtures_dir}")
+        # Re-key from the saved request, so fixtures recorded under older keys still match
+        self.by_key = {
+            request_key(fixture["request"]) if "request" in fixture else fixture["key"]: fixture
+            for fixture in self.fixtures
+        }
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.strict = strict
+        self.messages = _ReplayMessages(self)
+        self._next = 0
+        self._lock = threading.Lock()  # Parallel generation replays from worker threads
+
+    def lookup(self, params: dict) -> tuple[Message, float]:
+        """The recorded message for a request and the latency to apply."""
+        fixture = self.by_key.get(request_key(params))
+        if fixture is None:
+            if self.strict:
+                raise ReplayMiss(f"No fixture recorded for request {request_key(params)[:16]}")
+            with self._lock:
+                fixture = self.fixtures[self._next % len(self.fixtures)]
+                self._next += 1
+        latency = fixture.get("latency", 0.0) if self.latency is None else self.latency
+        return Message.model_validate(fixture["response"]), latency
@@ -0,0 +1,122 @@
+"""
+Model routing for generation requests
+
+Each kind of request - the day's skeleton, each career level, full-day
+generation, repairs and Part 2 refreshes - has a route: the models to try
+in order and an optional output budget. The first model handles the first
+attempt; when its output fails the quality gate, retries escalate down the
+list. RouteStats keeps per-route, per-model latency, token cost and gate
+failures so the table can be tuned.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+FAST_MODEL = "claude-3-5-haiku-20241022"
+STRONG_MODEL = "claude-sonnet-4-20250514"
+
+# USD per million tokens: input, output. Cache writes cost 1.25x input, cache reads 0.1x.
+PRICES = {
+    FAST_MODEL: (0.80, 4.00),
+    STRONG_MODEL: (3.00, 15.00),
+}
+
+# Most output tokens each model accepts as max_tokens
+MAX_OUTPUT_TOKENS = {
+    FAST_MODEL: 8192,
+    STRONG_MODEL: 64000,
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    models: tuple[str, ...]  # Escalation order
+    max_tokens: Optional[int] = None  # Default output budget; None uses the generator's
+
+    def model_for(self, attempt: int) -> str:
+        return self.models[min(attempt, len(self.models) - 1)]
+
+
+# Team Lead and Supervisor scenarios (and the title/theme skeleton) are simple
+# enough for the fast model; everything else starts on the strong one. The
+# per-level routes only apply to parallel generation: a single-call day writes
+# every level in one response on the "scenario" route. Prompt caches are per
+# model, so parallel generation warms the strong model's cache while the fast
+# model writes the skeleton.
+DEFAULT_ROUTES = {
+    "skeleton": Route((FAST_MODEL, STRONG_MODEL)),
+    "level_1": Route((FAST_MODEL, STRONG_MODEL)),
+    "level_2": Route((FAST_MODEL, STRONG_MODEL)),
+    "level_3": Route((STRONG_MODEL,)),
+    "level_4": Route((STRONG_MODEL,)),
+    "level_5": Route((STRONG_MODEL,)),
+    "level_6": Route((STRONG_MODEL,)),
+    "scenario": Route((STRONG_MODEL,)),  # All six levels in one response
+    "repair": Route((STRONG_MODEL,)),  # Repairs and feedback revisions
+    "part2": Route((STRONG_MODEL,)),  # Upper levels rewritten once Part 2 unlocks
+}
+
+
+def load_routes(path: Path) -> dict[str, Route]:
+    """
+    Default routes overridden from a JSON file, e.g.
+    {"level_3": {"models": ["claude-3-5-haiku-20241022", "claude-sonnet-4-20250514"], "max_tokens": 3000}}
+    """
+    overrides = json.loads(Path(path).read_text())
+    routes = dict(DEFAULT_ROUTES)
+    for name, entry in overrides.items():
+        if name not in DEFAULT_ROUTES:
+            raise ValueError(f"Unknown route: {name}")
+        if not entry.get("models"):
+            raise ValueError(f"Route {name} needs at least one model")
+        routes[name] = Route(tuple(entry["models"]), entry.get("max_tokens"))
+    return routes
+
+
+def cost(model: str, usage: Any) -> float:
+    """USD for one call's usage; 0.0 for models without a price."""
+    if model not in PRICES:
+        return 0.0
+    input_price, output_price = PRICES[model]
+    tokens = (
+        (getattr(usage, "input_tokens", None) or 0) * input_price
+        + (getattr(usage, "cache_creation_input_tokens", None) or 0) * input_price * 1.25
+        + (getattr(usage, "cache_read_input_tokens", None) or 0) * input_price * 0.1
+        + (getattr(usage, "output_tokens", None) or 0) * output_price
+    )
+    return tokens / 1_000_000
+
+
+class RouteStats:
+    """Calls, latency, cost and quality-gate failures per (route, model)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries: dict[tuple[str, str], dict[str, float]] = {}
+
+    def _entry(self, route: str, model: str) -> dict[str, float]:
+        return self.entries.setdefault((route, model), {"calls": 0, "seconds": 0.0, "cost": 0.0, "failed": 0})
+
+    def record(self, route: str, model: str, seconds: float, usage: Any) -> None:
+        with self._lock:
+            entry = self._entry(route, model)
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["cost"] += cost(model, usage)
+
+    def failed(self, route: str, model: str) -> None:
+        with self._lock:
+            self._entry(route, model)["failed"] += 1
+
+    def summary(self) -> list[str]:
+        with self._lock:
+            entries = sorted(self.entries.items())
+        return [
+            f"{route} via {model}: {entry['calls']:.0f} calls, "
+            f"{entry['seconds'] / entry['calls'] if entry['calls'] else 0:.1f}s avg, "
+            f"${entry['cost']:.4f}, {entry['failed']:.0f} failed the quality gate"
+            for (route, model), entry in entries
+        ]
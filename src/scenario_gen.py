@@ -2,26 +2,90 @@
 Transforms AoC puzzles into management parody scenarios with 6 difficulty levels
 """
 
+import hashlib
 import json
+import logging
 import re
-from dataclasses import dataclass, field, asdict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
-import anthropic
-
 from .aoc_client import AoCPuzzle
-
-
-@dataclass
+from .api_client import APIClient
+from .api_standin import is_standin_url
+from .cache import CacheStore
+from .hedging import Attempt, Hedger, LatencyHistory
+from .json_stream import JSONStreamScanner
+from .json_writer import dumps_indented
+from .replay import ReplayClient
+from .routing import DEFAULT_ROUTES, MAX_OUTPUT_TOKENS, STRONG_MODEL, Route, RouteStats
+from .schema import LEVEL_KEYS, SchemaError, Violation, check_scenario, validate_level
+from .token_budget import TokenBudget
+
+logger = logging.getLogger(__name__)
+
+CAREER_TITLES = {
+    "level_1": "Team Lead",
+    "level_2": "Supervisor",
+    "level_3": "Manager",
+    "level_4": "Director",
+    "level_5": "VP",
+    "level_6": "C-Suite",
+}
+CAST_HEADING = re.compile(r"^### (.+)\n- \*\*Title\*\*:", re.MULTILINE)
+# Director and up take on the Part 2 twist; a scenario generated from Part 1 alone gets these rewritten
+PART2_LEVELS = ["level_4", "level_5", "level_6"]
+# Token budget labels of a whole-day response: every level plus the title/theme/hooks
+SCENARIO_LABELS = [*LEVEL_KEYS, "skeleton"]
+
+# Routes each kind of generation may use, which its cached results depend on
+SINGLE_ROUTES = ["scenario", "repair"]
+PARALLEL_ROUTES = ["skeleton", *LEVEL_KEYS]
+PART2_ROUTES = ["part2", "repair"]
+
+USAGE_FIELDS = ["input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"]
+
+
+@lru_cache(maxsize=4)
+def cast_names(cast_document: str) -> frozenset[str]:
+    """Character names in the cast document: each "### Name" heading followed by a Title line."""
+    return frozenset(name.strip() for name in CAST_HEADING.findall(cast_document))
+
+
+def ensure_victory_step(level_data: Any) -> None:
+    """Mark the last solution step as the victory step when the model marked none."""
+    steps = level_data.get("solution_steps") if isinstance(level_data, dict) else None
+    if not isinstance(steps, list) or not steps or not all(isinstance(step, dict) for step in steps):
+        return
+    if not any(step.get("victory", False) for step in steps):
+        steps[-1]["victory"] = True
+
+
+# The models are slotted and convert to and from dicts by hand: dataclasses.asdict
+# deep-copies every field through a generic recursive walk. to_dict() builds new
+# containers for the model's own structure (levels, NPCs, steps) but shares the
+# leaf lists and dicts (hints, state_changes, ...) with the model, and from_dict()
+# shares them with its input; neither mutates what it is given.
+@dataclass(slots=True)
 class NPC:
     name: str
     role: str
     quirk: str
     secret: str
 
+    def to_dict(self) -> dict:
+        return {"name": self.name, "role": self.role, "quirk": self.quirk, "secret": self.secret}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NPC":
+        return cls(data["name"], data["role"], data["quirk"], data["secret"])
+
 
-@dataclass
+@dataclass(slots=True)
 class SolutionStep:
     step: int
     description: str
@@ -31,8 +95,31 @@ class SolutionStep:
     unlocks: str | None = None
     victory: bool = False
 
+    def to_dict(self) -> dict:
+        return {
+            "step": self.step,
+            "description": self.description,
+            "action_patterns": self.action_patterns,
+            "narrative_result": self.narrative_result,
+            "state_changes": self.state_changes,
+            "unlocks": self.unlocks,
+            "victory": self.victory,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SolutionStep":
+        return cls(
+            data["step"],
+            data["description"],
+            data["action_patterns"],
+            data["narrative_result"],
+            data.get("state_changes", {}),
+            data.get("unlocks"),
+            data.get("victory", False),
+        )
+
 
-@dataclass
+@dataclass(slots=True)
 class LevelScenario:
     """A scenario variant for a specific career level."""
     career_title: str
@@ -45,8 +132,35 @@ class LevelScenario:
     hints: list[str]
     victory_message: str
 
+    def to_dict(self) -> dict:
+        return {
+            "career_title": self.career_title,
+            "setup_narrative": self.setup_narrative,
+            "initial_state": self.initial_state,
+            "npcs": [npc.to_dict() for npc in self.npcs],
+            "solution_steps": [step.to_dict() for step in self.solution_steps],
+            "optimal_turn_count": self.optimal_turn_count,
+            "consequences": self.consequences,
+            "hints": self.hints,
+            "victory_message": self.victory_message,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LevelScenario":
+        return cls(
+            career_title=data.get("career_title", ""),
+            setup_narrative=data.get("setup_narrative", ""),
+            initial_state=data.get("initial_state", {}),
+            npcs=[NPC.from_dict(npc) for npc in data.get("npcs", [])],
+            solution_steps=[SolutionStep.from_dict(step) for step in data.get("solution_steps", [])],
+            optimal_turn_count=data.get("optimal_turn_count", 4),
+            consequences=data.get("consequences", {}),
+            hints=data.get("hints", []),
+            victory_message=data.get("victory_message", ""),
+        )
+
 
-@dataclass
+@dataclass(slots=True)
 class MultiLevelScenario:
     """A complete scenario with all 6 difficulty levels."""
     day: int
@@ -55,74 +169,44 @@ class MultiLevelScenario:
     aoc_theme: str
     levels: dict[str, LevelScenario]  # level_1 through level_6
     continuity_hooks: dict[str, str] | None = None
+    part2_included: bool = True  # False: generated from Part 1 alone, PART2_LEVELS refresh later
 
     def to_dict(self) -> dict:
         """Convert to JSON-serializable dict."""
-        data = {
+        return {
             "day": self.day,
             "year": self.year,
             "title": self.title,
             "aoc_theme": self.aoc_theme,
-            "levels": {},
-            "continuity_hooks": self.continuity_hooks or {}
+            "levels": {level_key: level.to_dict() for level_key, level in self.levels.items()},
+            "continuity_hooks": self.continuity_hooks or {},
+            "part2_included": self.part2_included,
         }
 
-        for level_key, level in self.levels.items():
-            data["levels"][level_key] = {
-                "career_title": level.career_title,
-                "setup_narrative": level.setup_narrative,
-                "initial_state": level.initial_state,
-                "npcs": [asdict(npc) for npc in level.npcs],
-                "solution_steps": [asdict(step) for step in level.solution_steps],
-                "optimal_turn_count": level.optimal_turn_count,
-                "consequences": level.consequences,
-                "hints": level.hints,
-                "victory_message": level.victory_message
-            }
-
-        return data
-
     def to_json(self) -> str:
         """Convert to JSON string."""
-        return json.dumps(self.to_dict(), indent=2)
+        return dumps_indented(self.to_dict())
 
     @classmethod
     def from_dict(cls, data: dict) -> "MultiLevelScenario":
-        """Create from dictionary."""
-        levels = {}
-        for level_key, level_data in data.get("levels", {}).items():
-            npcs = [NPC(**npc) for npc in level_data.get("npcs", [])]
-            steps = []
-            for step_data in level_data.get("solution_steps", []):
-                step_data.setdefault("unlocks", None)
-                step_data.setdefault("victory", False)
-                step_data.setdefault("state_changes", {})
-                steps.append(SolutionStep(**step_data))
-
-            levels[level_key] = LevelScenario(
-                career_title=level_data.get("career_title", ""),
-                setup_narrative=level_data.get("setup_narrative", ""),
-                initial_state=level_data.get("initial_state", {}),
-                npcs=npcs,
-                solution_steps=steps,
-                optimal_turn_count=level_data.get("optimal_turn_count", 4),
-                consequences=level_data.get("consequences", {}),
-                hints=level_data.get("hints", []),
-                victory_message=level_data.get("victory_message", "")
-            )
-
+        """Create from dictionary. Raises SchemaError if it isn't a valid scenario."""
+        check_scenario(data)
         return cls(
             day=data.get("day", 0),
             year=data.get("year", 0),
             title=data.get("title", ""),
             aoc_theme=data.get("aoc_theme", ""),
-            levels=levels,
-            continuity_hooks=data.get("continuity_hooks")
+            levels={
+                level_key: LevelScenario.from_dict(level_data)
+                for level_key, level_data in data.get("levels", {}).items()
+            },
+            continuity_hooks=data.get("continuity_hooks"),
+            part2_included=data.get("part2_included", True),
         )
 
 
 # Keep legacy class for backwards compatibility
-@dataclass
+@dataclass(slots=True)
 class ManagementScenario:
     """Legacy single-level scenario (for backwards compatibility)."""
     day: int
@@ -143,28 +227,118 @@ class ManagementScenario:
 
     def to_dict(self) -> dict:
         """Convert to JSON-serializable dict."""
-        data = asdict(self)
-        data["npcs"] = [asdict(npc) for npc in self.npcs]
-        data["solution_steps"] = [asdict(step) for step in self.solution_steps]
-        return data
+        return {
+            "day": self.day,
+            "year": self.year,
+            "title": self.title,
+            "aoc_theme": self.aoc_theme,
+            "setup_narrative": self.setup_narrative,
+            "initial_state": self.initial_state,
+            "npcs": [npc.to_dict() for npc in self.npcs],
+            "solution_steps": [step.to_dict() for step in self.solution_steps],
+            "optimal_turn_count": self.optimal_turn_count,
+            "consequences": self.consequences,
+            "hints": self.hints,
+            "victory_message": self.victory_message,
+        }
 
     def to_json(self) -> str:
         """Convert to JSON string."""
-        return json.dumps(self.to_dict(), indent=2)
+        return dumps_indented(self.to_dict())
 
     @classmethod
     def from_dict(cls, data: dict) -> "ManagementScenario":
         """Create from dictionary."""
-        npcs = [NPC(**npc) for npc in data.pop("npcs")]
-        steps = [SolutionStep(**step) for step in data.pop("solution_steps")]
-        return cls(npcs=npcs, solution_steps=steps, **data)
+        fields = {name: value for name, value in data.items() if name not in ("npcs", "solution_steps")}
+        npcs = [NPC.from_dict(npc) for npc in data["npcs"]]
+        steps = [SolutionStep.from_dict(step) for step in data["solution_steps"]]
+        return cls(npcs=npcs, solution_steps=steps, **fields)
+
+
+def load_scenario(data: dict) -> MultiLevelScenario | ManagementScenario:
+    """
+    Build a published scenario in either format. Multi-level scenarios are
+    schema-checked (SchemaError); legacy single-level ones, which predate the
+    schema and have no "levels", are loaded as ManagementScenario.
+    """
+    if "levels" not in data and "solution_steps" in data:
+        return ManagementScenario.from_dict(data)
+    return MultiLevelScenario.from_dict(data)
 
 
 class ScenarioGenerator:
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    MODEL = STRONG_MODEL  # Full-day generation; per-request models come from self.routes
+    # Output budgets until there is response history to plan from (see src/token_budget.py)
+    MAX_TOKENS = 16000  # All 6 levels in one response
+    LEVEL_MAX_TOKENS = 4000  # One level
+    SKELETON_MAX_TOKENS = 1000
+    MAX_CONTINUATIONS = 2  # Follow-up requests when a response stops at max_tokens
+    CACHE_DIR = Path(".cache/generation")
+    STANDIN_CACHE_DIR = Path(".cache/generation-standin")  # Results, batches and history from a local stand-in
+    RESULT_CACHE_BYTES = 64 * 1024 * 1024
+    MAX_REPAIR_ROUNDS = 2  # Targeted level repairs before regenerating the whole response
+    BATCH_STATE_KEY = "batch-state"  # Batch in flight, so a restart resumes polling instead of resubmitting
+    BATCH_POLL_INITIAL = 5.0  # Seconds
+    BATCH_POLL_MAX = 60.0
+
+    def __init__(
+        self,
+        api_key: str,
+        use_cache: bool = True,
+        base_url: str | None = None,
+        max_in_flight: int = 4,
+        request_timeout: float = 300.0,
+        hedge_percentile: float | None = None,
+        count_tokens: bool = False,
+        routes: dict[str, Route] | None = None,
+        cache_dir: Path | None = None,
+    ):
+        # base_url points the client at another endpoint, e.g. the local stand-in (src/api_standin.py).
+        # One limited client is shared by every call, including parallel and batch work.
+        self.base_url = base_url
+        self.client = APIClient.create(
+            api_key, base_url, max_in_flight=max_in_flight, timeout=request_timeout
+        )
+        self.use_cache = use_cache  # False skips cache lookups; fresh results are still stored
+        # A stand-in's batches and results never share a directory with real ones
+        if cache_dir is None:
+            cache_dir = self.STANDIN_CACHE_DIR if is_standin_url(base_url) else self.CACHE_DIR
+        self.result_cache = CacheStore(cache_dir, compression="gzip", max_bytes=self.RESULT_CACHE_BYTES)
+        # Long-lived state (the batch in flight, latency and output-size history) must survive the
+        # result cache's LRU eviction, so it lives in its own unbounded store
+        self.state_store = CacheStore(Path(cache_dir) / "state")
+        # With a percentile, generate() races a backup request when the first one is slower than that
+        self.hedger = None
+        if hedge_percentile is not None:
+            self.hedger = Hedger(LatencyHistory(self.state_store), hedge_percentile)
+        # Output budgets from past response sizes; prompts counted locally, or by the API with count_tokens
+        # (those answers are only a cache, so they may be evicted with the results)
+        self.budget = TokenBudget(self.state_store, counts=self.result_cache)
+        self.count_tokens = count_tokens
+        # Which models handle each kind of request, escalating on quality-gate failures (src/routing.py)
+        self.routes = routes or DEFAULT_ROUTES
+        self.route_stats = RouteStats()
         self.scenario_prompt = self._load_prompt("prompts/scenario_prompt.md")
         self.cast_document = self._load_prompt("prompts/north_pole_cast.md")
+        self.usage_totals = dict.fromkeys([*USAGE_FIELDS, "calls"], 0)
+        self._usage_lock = threading.Lock()  # Parallel generation records usage from worker threads
+
+    @property
+    def client_kind(self) -> str:
+        """
+        What answers requests: "replay" for recorded fixtures, "stand-in" for
+        an endpoint on this machine, "api" for the real model.
+        """
+        if isinstance(self.client, ReplayClient):
+            return "replay"
+        if is_standin_url(self.base_url):
+            return "stand-in"
+        return "api"
+
+    @property
+    def real_model(self) -> bool:
+        """True if responses come from the real model, so their timings and sizes are worth keeping."""
+        return self.client_kind == "api"
 
     def _load_prompt(self, path: str) -> str:
         """Load prompt from file."""
@@ -173,17 +347,27 @@ class ScenarioGenerator:
             return prompt_path.read_text()
         raise FileNotFoundError(f"Required prompt file not found: {path}")
 
-    def _build_generation_prompt(self, puzzle: AoCPuzzle) -> str:
-        """Build the prompt for scenario generation."""
-        return f"""## OFFICIAL CAST DOCUMENT
+    def _build_system(self) -> list[dict]:
+        """
+        System prompt plus cast document. Identical for every request, so it is
+        marked as a prompt-cache breakpoint and everything per-day goes after it.
+        """
+        return [
+            {"type": "text", "text": self.scenario_prompt},
+            {
+                "type": "text",
+                "text": f"""## OFFICIAL CAST DOCUMENT
 
 You MUST use ONLY characters from this document. Use their EXACT names and titles.
 
-{self.cast_document}
+{self.cast_document}""",
+                "cache_control": {"type": "ephemeral"},
+            },
+        ]
 
----
-
-## SCENARIO PARAMETERS
+    def _build_puzzle_context(self, puzzle: AoCPuzzle) -> str:
+        """Day parameters and source puzzle - shared by every prompt."""
+        return f"""## SCENARIO PARAMETERS
 
 **Day**: {puzzle.day} (This scenario takes place on December {puzzle.day})
 **Days until Big Delivery**: {25 - puzzle.day}
@@ -192,7 +376,11 @@ You MUST use ONLY characters from this document. Use their EXACT names and title
 
 ## SOURCE PUZZLE: Day {puzzle.day} - {puzzle.title}
 
-{puzzle.description_text}
+{puzzle.description_text}"""
+
+    def _build_generation_prompt(self, puzzle: AoCPuzzle) -> str:
+        """Build the prompt for scenario generation."""
+        return f"""{self._build_puzzle_context(puzzle)}
 
 ---
 
@@ -201,11 +389,271 @@ You MUST use ONLY characters from this document. Use their EXACT names and title
 1. Analyze the core THEME of this puzzle (the conceptual mechanic, not the code)
 2. Create 6 management parody scenario variants set on December {puzzle.day} at North Pole Operations
 3. Each variant is for a different career level (Team Lead through C-Suite)
-4. Use characters from the OFFICIAL CAST DOCUMENT above (exact names and titles!)
+4. Use characters from the OFFICIAL CAST DOCUMENT in the system prompt (exact names and titles!)
 5. Scale difficulty appropriately for each level
 
 Return ONLY valid JSON matching the specified format with ALL 6 LEVELS. No markdown code blocks, no explanation - just the JSON object."""
 
+    def _build_skeleton_prompt(self, puzzle: AoCPuzzle) -> str:
+        """Build the prompt for the shared day skeleton used by parallel generation."""
+        return f"""{self._build_puzzle_context(puzzle)}
+
+---
+
+## YOUR TASK
+
+The six career-level variants will be written separately. For THIS request, only decide what they share:
+
+1. Analyze the core THEME of this puzzle (the conceptual mechanic, not the code)
+2. Choose the catchy corporate-speak title used by all 6 levels
+3. Write the continuity hooks for December {puzzle.day}
+
+Return ONLY a JSON object with exactly these keys: "title", "aoc_theme", "continuity_hooks" (an object with "references_past" and "sets_up_future"). No markdown code blocks, no explanation."""
+
+    def _build_level_prompt(self, puzzle: AoCPuzzle, skeleton: dict, level_key: str) -> str:
+        """Build the prompt for a single career level in parallel generation."""
+        level_number = level_key.split("_")[1]
+        return f"""{self._build_puzzle_context(puzzle)}
+
+---
+
+## SHARED SCENARIO
+
+**Title**: {skeleton["title"]}
+**Theme**: {skeleton["aoc_theme"]}
+
+---
+
+## YOUR TASK
+
+The other levels are being written separately. For THIS request, write ONLY the Level {level_number} ({CAREER_TITLES[level_key]}) variant of this scenario:
+
+1. Keep the shared title and theme above
+2. Scale scope, NPC count, solution steps and hints for a {CAREER_TITLES[level_key]} as described in the level table
+3. Use characters from the OFFICIAL CAST DOCUMENT in the system prompt (exact names and titles!)
+4. The final solution step must have "victory": true
+
+Return ONLY the JSON object for this one level (the value that would go under "{level_key}": career_title, setup_narrative, initial_state, npcs, solution_steps, optimal_turn_count, consequences, hints, victory_message). No markdown code blocks, no explanation."""
+
+    def _record_usage(self, usage: Any) -> None:
+        """Log one call's token usage, including prompt-cache reads/writes, and add it to the totals."""
+        counts = {name: getattr(usage, name, None) or 0 for name in USAGE_FIELDS}
+        with self._usage_lock:
+            for name, value in counts.items():
+                self.usage_totals[name] += value
+            self.usage_totals["calls"] += 1
+        logger.info(
+            f"  Tokens: {counts['input_tokens']} in, {counts['output_tokens']} out, "
+            f"cache read {counts['cache_read_input_tokens']}, "
+            f"cache write {counts['cache_creation_input_tokens']}"
+        )
+
+    def usage_summary(self) -> str:
+        """Token totals since startup, with the share of cacheable input served from cache."""
+        totals = dict(self.usage_totals)
+        cached = totals["cache_read_input_tokens"]
+        cacheable = cached + totals["cache_creation_input_tokens"]
+        hit_rate = cached / cacheable if cacheable else 0.0
+        return (
+            f"{totals['calls']} calls, {totals['input_tokens']} uncached in, "
+            f"{totals['output_tokens']} out, cache read {cached}, "
+            f"cache write {totals['cache_creation_input_tokens']} ({hit_rate:.0%} cache hit rate)"
+        )
+
+    def _build_repair_prompt(self, puzzle: AoCPuzzle, data: dict, invalid: dict[str, list[str]]) -> str:
+        """Build the prompt asking for replacements of only the invalid levels."""
+        problems = []
+        for level_key, errors in invalid.items():
+            previous = data["levels"].get(level_key)
+            problems.append(f"### {level_key} ({CAREER_TITLES[level_key]})\n\nErrors:\n")
+            problems.append("\n".join(f"- {error}" for error in errors))
+            if previous is not None:
+                problems.append(f"\n\nPrevious version:\n\n{json.dumps(previous)}")
+            problems.append("\n\n")
+
+        return f"""{self._build_puzzle_context(puzzle)}
+
+---
+
+## SHARED SCENARIO
+
+**Title**: {data.get("title", "")}
+**Theme**: {data.get("aoc_theme", "")}
+
+---
+
+## LEVELS THAT FAILED VALIDATION
+
+{"".join(problems).rstrip()}
+
+---
+
+## YOUR TASK
+
+The other levels were valid and are being kept. Rewrite ONLY the levels listed above so they fix every error, keeping the shared title and theme. Use characters from the OFFICIAL CAST DOCUMENT in the system prompt (exact names and titles!).
+
+Return ONLY a JSON object whose keys are exactly: {", ".join(f'"{key}"' for key in invalid)}. Each value is the complete level object. No markdown code blocks, no explanation."""
+
+    def _messages(self, user_prompt: str, partial: str = "") -> list[dict]:
+        """The conversation for a request; `partial` is prefilled to continue a truncated response."""
+        messages = [{"role": "user", "content": user_prompt}]
+        if partial:
+            messages.append({"role": "assistant", "content": partial})
+        return messages
+
+    def route_summary(self) -> list[str]:
+        """Latency, cost and quality-gate failures per route and model since startup."""
+        return self.route_stats.summary()
+
+    def _gate_failed(self, route: str, retry: int, retrying: bool) -> None:
+        """Count a response that failed the quality gate, noting when the retry moves to a stronger model."""
+        model = self.routes[route].model_for(retry)
+        self.route_stats.failed(route, model)
+        if retrying and self.routes[route].model_for(retry + 1) != model:
+            logger.info(f"  Escalating {route} from {model} to {self.routes[route].model_for(retry + 1)}")
+
+    def _plan(self, user_prompt: str, labels: list[str], default: int, route: str = "scenario", retry: int = 0) -> int:
+        """
+        max_tokens for a response made of `labels` (level keys and/or
+        "skeleton"), within the route model's output limit. A whole day never
+        gets less than `default`.
+        """
+        model = self.routes[route].model_for(retry)
+        params = {
+            "model": model,
+            "system": self._build_system(),
+            "messages": self._messages(user_prompt),
+        }
+        default = self.routes[route].max_tokens or default
+        prompt_tokens = self.budget.count_prompt(params, self.client if self.count_tokens else None)
+        max_tokens = self.budget.max_tokens(
+            labels,
+            default,
+            prompt_tokens,
+            floor=default if set(LEVEL_KEYS) <= set(labels) else None,
+            cap=MAX_OUTPUT_TOKENS.get(model),
+        )
+        logger.info(f"  Budget: ~{prompt_tokens} prompt tokens, max_tokens {max_tokens}")
+        return max_tokens
+
+    def _observe_output(self, text: str, usage: Any, stop_reason: str | None, labels: list[str] | None) -> None:
+        """
+        Calibrate the token budget from a response and, if it stopped at
+        max_tokens, plan more for its `labels` next time. Only real-model
+        responses count; a stand-in's or replay's sizes would skew the budget.
+        """
+        if not self.real_model:
+            return
+        self.budget.observe(text, getattr(usage, "output_tokens", None))
+        if stop_reason == "max_tokens" and labels:
+            self.budget.truncated(labels)
+            self.budget.save()
+
+    def _complete(
+        self,
+        user_prompt: str,
+        max_tokens: int,
+        route: str = "scenario",
+        retry: int = 0,
+        partial: str = "",
+        labels: list[str] | None = None,
+    ) -> str:
+        """
+        Send one generation request to the route's model for this retry and
+        return the response text. A response that stops at max_tokens is
+        continued from where it stopped (up to MAX_CONTINUATIONS times)
+        instead of being thrown away, and raises the budget for `labels`.
+        """
+        model = self.routes[route].model_for(retry)
+        response_text = partial
+        for continuation in range(self.MAX_CONTINUATIONS + 1):
+            started = time.monotonic()
+            response = self.client.messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                messages=self._messages(user_prompt, response_text),
+                system=self._build_system(),
+            )
+
+            self._record_usage(response.usage)
+            self.route_stats.record(route, model, time.monotonic() - started, response.usage)
+
+            text = "".join(block.text for block in response.content if block.type == "text")
+            self._observe_output(text, response.usage, response.stop_reason, labels)
+            response_text += text
+            if response.stop_reason != "max_tokens" or continuation == self.MAX_CONTINUATIONS:
+                break
+            # The API rejects prefills ending in whitespace; outside strings JSON doesn't need it
+            response_text = response_text.rstrip()
+            logger.info(f"  Response stopped at max_tokens ({max_tokens}), continuing...")
+        return response_text
+
+    def _stream_text(self, user_prompt: str, max_tokens: int, attempt: Attempt, retry: int = 0) -> str:
+        """
+        Stream one full-day request to completion (continuing it if it stops
+        at max_tokens), or until the attempt is cancelled. Returns the text so far.
+        """
+        model = self.routes["scenario"].model_for(retry)
+        response_text = ""
+        for continuation in range(self.MAX_CONTINUATIONS + 1):
+            if attempt.cancel.is_set():
+                break
+            chunks = []
+            stop_reason = None
+            started = time.monotonic()
+            try:
+                with self.client.messages.stream(
+                    model=model,
+                    max_tokens=max_tokens,
+                    messages=self._messages(user_prompt, response_text),
+                    system=self._build_system(),
+                ) as stream:
+                    # The hedger closes the stream of a losing attempt, even one still waiting for its first token
+                    attempt.on_cancel(stream.close)
+                    try:
+                        for text in stream.text_stream:
+                            attempt.mark_first_token()
+                            chunks.append(text)
+                            if attempt.cancel.is_set():
+                                break  # Leaving the stream context closes the connection
+                    finally:
+                        if chunks:
+                            snapshot = stream.current_message_snapshot
+                            self._record_usage(snapshot.usage)
+                            self.route_stats.record("scenario", model, time.monotonic() - started, snapshot.usage)
+                            self._observe_output("".join(chunks), snapshot.usage, snapshot.stop_reason, SCENARIO_LABELS)
+                    stop_reason = stream.current_message_snapshot.stop_reason if chunks else None
+            except Exception:
+                if not attempt.cancel.is_set():
+                    raise  # A real failure, not the stream being closed under us
+            response_text += "".join(chunks)
+            if attempt.cancel.is_set() or stop_reason != "max_tokens" or continuation == self.MAX_CONTINUATIONS:
+                break
+            response_text = response_text.rstrip()
+            logger.info(f"  Response stopped at max_tokens ({max_tokens}), continuing...")
+        return response_text
+
+    def _acceptable(self, response_text: str) -> bool:
+        """True if a response parses and every level is valid as-is."""
+        try:
+            data = self._extract_json(response_text)
+        except (json.JSONDecodeError, ValueError):
+            return False
+        return "title" in data and "aoc_theme" in data and not self._invalid_levels(data)
+
+    def _hedged_complete(self, user_prompt: str, max_tokens: int, retry: int = 0) -> str:
+        """
+        Like _complete(), but hedged: the first acceptable response from either
+        copy is used. Latency history is kept per endpoint and model.
+        """
+        model = self.routes["scenario"].model_for(retry)
+        return self.hedger.run(
+            f"generate:{self.base_url or 'api'}:{model}",
+            lambda attempt: self._stream_text(user_prompt, max_tokens, attempt, retry),
+            self._acceptable,
+            record=self.real_model,
+        )
+
     def _extract_json(self, response_text: str) -> dict:
         """Extract JSON from response, handling various formats."""
         text = response_text.strip()
@@ -241,93 +689,531 @@ Return ONLY valid JSON matching the specified format with ALL 6 LEVELS. No markd
         json_str = text[start:end]
         return json.loads(json_str)
 
+    def _result_key(self, mode: str, puzzle: AoCPuzzle, routes: list[str], extra: Any = None) -> str:
+        """
+        Hash of everything that determines a generation's output, including
+        the endpoint and kind of client answering, and the full
+        configuration (escalation models and budget override) of every route
+        it may use. Planned max_tokens aren't part of it: responses that hit
+        the limit are continued, not cut short.
+        """
+        inputs = [
+            mode,
+            [self.client_kind, self.base_url],
+            {name: [list(self.routes[name].models), self.routes[name].max_tokens] for name in routes},
+            self.scenario_prompt,
+            self.cast_document,
+            puzzle.year,
+            puzzle.day,
+            puzzle.title,
+            puzzle.description_text,
+        ]
+        if extra is not None:
+            inputs.append(extra)
+        return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+    def _cached_result(self, key: str) -> MultiLevelScenario | None:
+        """Return a previously generated scenario for these exact inputs."""
+        if not self.use_cache:
+            return None
+        entry = self.result_cache.get_json(key)
+        if entry is None:
+            return None
+        try:
+            scenario = MultiLevelScenario.from_dict(entry["scenario"])
+        except (KeyError, ValueError):
+            # Outdated entry - treat as a miss
+            return None
+        logger.info(f"  Using cached generation {key[:12]} (no API call)")
+        return scenario
+
+    def _store_result(
+        self, key: str, raw_response: str, scenario: MultiLevelScenario, model: str | dict[str, str]
+    ) -> None:
+        """
+        Keep the raw response and the validated scenario for identical future
+        runs. `model` is the model that wrote the response (per part, for
+        parallel generation).
+        """
+        self.result_cache.put_json(key, {
+            "model": model,
+            "created_at": time.time(),
+            "raw_response": raw_response,
+            "scenario": scenario.to_dict(),
+        })
+
     def generate(self, puzzle: AoCPuzzle, max_retries: int = 3) -> MultiLevelScenario:
         """Generate a multi-level management scenario from an AoC puzzle."""
+        cache_key = self._result_key("single", puzzle, SINGLE_ROUTES)
+        if (cached := self._cached_result(cache_key)) is not None:
+            return cached
+
         user_prompt = self._build_generation_prompt(puzzle)
 
         last_error = None
         for attempt in range(max_retries):
             try:
-                response = self.client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=16000,  # Increased for 6 levels
-                    messages=[
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    system=self.scenario_prompt,
-                )
-
-                # Extract text
-                response_text = ""
-                for block in response.content:
-                    if block.type == "text":
-                        response_text += block.text
+                max_tokens = self._plan(user_prompt, SCENARIO_LABELS, self.MAX_TOKENS, retry=attempt)
+                if self.hedger is not None:
+                    response_text = self._hedged_complete(user_prompt, max_tokens, attempt)
+                else:
+                    response_text = self._complete(user_prompt, max_tokens, retry=attempt, labels=SCENARIO_LABELS)
 
                 # Parse JSON
                 data = self._extract_json(response_text)
 
-                # Add day/year
+                # Add day/year and whether Part 2 was available
                 data["day"] = puzzle.day
                 data["year"] = puzzle.year
+                data["part2_included"] = puzzle.part2_unlocked
+
+                # Validate and build scenario, regenerating only invalid levels
+                scenario = self._repair_and_build(puzzle, data)
+                self._store_result(cache_key, response_text, scenario, self.routes["scenario"].model_for(attempt))
+                return scenario
 
-                # Validate and build scenario
+            except (json.JSONDecodeError, ValueError) as e:
+                last_error = e
+                if attempt < max_retries - 1:
+                    logger.warning(f"  Attempt {attempt + 1} failed: {e}. Retrying...")
+                self._gate_failed("scenario", attempt, attempt < max_retries - 1)
+                continue
+
+        raise last_error
+
+    def _stream_json(self, user_prompt: str, max_tokens: int, retry: int = 0) -> tuple[dict, str]:
+        """
+        Stream one generation request, validating each level as soon as its
+        object closes. Raises ValueError as soon as the output goes wrong;
+        leaving the stream context closes the connection, so the rest of the
+        response is never generated.
+        """
+        model = self.routes["scenario"].model_for(retry)
+        scanner = JSONStreamScanner()
+        started = time.monotonic()
+        first_level = None
+        held = ""  # Trailing whitespace inside a string, kept in the buffer but left out of the prefill
+
+        for continuation in range(self.MAX_CONTINUATIONS + 1):
+            received = 0
+            request_started = time.monotonic()
+            with self.client.messages.stream(
+                model=model,
+                max_tokens=max_tokens,
+                messages=self._messages(user_prompt, scanner.buffer[:len(scanner.buffer) - len(held)]),
+                system=self._build_system(),
+            ) as stream:
+                try:
+                    for text in stream.text_stream:
+                        if held and text:
+                            # The model usually starts by repeating the held-back whitespace; don't double it
+                            repeated = len(text) - len(text.lstrip())
+                            text = text[min(repeated, len(held)):]
+                            held = ""
+                        received += len(text)
+                        for path, raw in scanner.feed(text):
+                            if path == ("levels",):
+                                missing = [key for key in LEVEL_KEYS if key not in json.loads(raw)]
+                                if missing:
+                                    raise ValueError(f"Missing required level: {missing[0]}")
+                            elif len(path) == 2 and path[0] == "levels":
+                                self._check_level(path[1], json.loads(raw))
+                                if first_level is None:
+                                    first_level = time.monotonic() - started
+                                    logger.info(f"  First valid level ({path[1]}) after {first_level:.1f}s")
+                        if scanner.done:
+                            break
+                finally:
+                    # Input/cache counts arrive with message_start, so they are known even after an abort
+                    if received:
+                        snapshot = stream.current_message_snapshot
+                        self._record_usage(snapshot.usage)
+                        self.route_stats.record("scenario", model, time.monotonic() - request_started, snapshot.usage)
+                        self._observe_output(
+                            scanner.buffer[-received:], snapshot.usage, snapshot.stop_reason, SCENARIO_LABELS
+                        )
+                stop_reason = stream.current_message_snapshot.stop_reason if received else None
+
+            if scanner.done or stop_reason != "max_tokens" or continuation == self.MAX_CONTINUATIONS:
+                break
+            # Resume from the text so far; the scanner picks up where it stopped. The API rejects
+            # prefills ending in whitespace: outside strings it means nothing and is dropped, inside
+            # a string it is part of the value and is only left out of the prefill.
+            if scanner.in_string:
+                held = scanner.buffer[len(scanner.buffer.rstrip()):]
+            else:
+                scanner.buffer = scanner.buffer.rstrip()
+            logger.info(f"  Response stopped at max_tokens ({max_tokens}), continuing...")
+
+        if not scanner.done:
+            raise ValueError("Response ended before the JSON object was complete")
+        logger.info(f"  Streamed all levels in {time.monotonic() - started:.1f}s")
+        return json.loads(scanner.buffer[scanner.root_start:scanner.pos]), scanner.buffer
+
+    def _cast_violations(self, level_key: str, level_data: Any) -> list[Violation]:
+        """NPCs whose names aren't in the cast document (skipped if it defines no names)."""
+        names = cast_names(self.cast_document)
+        if not names or not isinstance(level_data, dict) or not isinstance(level_data.get("npcs"), list):
+            return []
+        return [
+            Violation(f"$.levels.{level_key}.npcs[{i}].name", f"{npc['name']!r} is not in the cast document")
+            for i, npc in enumerate(level_data["npcs"])
+            if isinstance(npc, dict) and isinstance(npc.get("name"), str) and npc["name"] not in names
+        ]
+
+    def _level_violations(self, level_key: str, level_data: Any) -> list[Violation]:
+        """The quality gate for one level: schema violations plus characters from outside the cast."""
+        ensure_victory_step(level_data)
+        return validate_level(level_data, level_key) + self._cast_violations(level_key, level_data)
+
+    def _check_level(self, level_key: str, level_data: Any) -> None:
+        """Raise SchemaError if a streamed or separately generated level fails the quality gate."""
+        if level_key not in LEVEL_KEYS:
+            raise ValueError(f"Unexpected level: {level_key}")
+        violations = self._level_violations(level_key, level_data)
+        if violations:
+            raise SchemaError(violations)
+
+    def _invalid_levels(self, data: dict) -> dict[str, list[str]]:
+        """Quality-gate violations for each level that is missing or invalid."""
+        levels = data.get("levels")
+        if not isinstance(levels, dict):
+            return {level_key: ["missing from the response"] for level_key in LEVEL_KEYS}
+        invalid = {}
+        for level_key in LEVEL_KEYS:
+            if level_key not in levels:
+                invalid[level_key] = ["missing from the response"]
+                continue
+            if violations := self._level_violations(level_key, levels[level_key]):
+                invalid[level_key] = [str(violation) for violation in violations]
+        return invalid
+
+    def _repair_and_build(self, puzzle: AoCPuzzle, data: dict) -> MultiLevelScenario:
+        """
+        Build the scenario, first regenerating only the levels that fail
+        validation. Valid levels are kept as they are. Raises ValueError if
+        levels are still invalid after MAX_REPAIR_ROUNDS.
+        """
+        for repair_round in range(self.MAX_REPAIR_ROUNDS + 1):
+            invalid = self._invalid_levels(data)
+            if not invalid:
                 return self._validate_and_build(data)
+            if repair_round == self.MAX_REPAIR_ROUNDS or len(invalid) == len(LEVEL_KEYS):
+                # Nothing worth keeping - let the caller regenerate from scratch
+                level_key, errors = next(iter(invalid.items()))
+                raise ValueError(f"{level_key}: {errors[0]}")
+
+            logger.info(f"  Repairing {', '.join(invalid)} ({sum(map(len, invalid.values()))} errors)...")
+            retrying = repair_round < self.MAX_REPAIR_ROUNDS - 1
+            try:
+                repair_prompt = self._build_repair_prompt(puzzle, data, invalid)
+                max_tokens = self._plan(
+                    repair_prompt, list(invalid), self.LEVEL_MAX_TOKENS * len(invalid), "repair", repair_round
+                )
+                repaired = self._extract_json(
+                    self._complete(repair_prompt, max_tokens, "repair", repair_round, labels=list(invalid))
+                )
+            except (json.JSONDecodeError, ValueError) as e:
+                logger.warning(f"  Repair attempt {repair_round + 1} failed: {e}")
+                self._gate_failed("repair", repair_round, retrying)
+                continue
+            for level_key in invalid:
+                if level_key in repaired:
+                    data["levels"][level_key] = repaired[level_key]
+            if any(level_key in self._invalid_levels(data) for level_key in invalid):
+                self._gate_failed("repair", repair_round, retrying)
+
+    def generate_streaming(self, puzzle: AoCPuzzle, max_retries: int = 3) -> MultiLevelScenario:
+        """
+        Like generate(), but streams the response and retries as soon as a
+        level fails validation instead of after the full response arrives.
+        """
+        # Same prompt and output as generate(), so both share cached results
+        cache_key = self._result_key("single", puzzle, SINGLE_ROUTES)
+        if (cached := self._cached_result(cache_key)) is not None:
+            return cached
+
+        user_prompt = self._build_generation_prompt(puzzle)
+
+        last_error = None
+        for attempt in range(max_retries):
+            try:
+                max_tokens = self._plan(user_prompt, SCENARIO_LABELS, self.MAX_TOKENS, retry=attempt)
+                data, response_text = self._stream_json(user_prompt, max_tokens, attempt)
+                data["day"] = puzzle.day
+                data["year"] = puzzle.year
+                data["part2_included"] = puzzle.part2_unlocked
+                scenario = self._validate_and_build(data)
+                self._store_result(cache_key, response_text, scenario, self.routes["scenario"].model_for(attempt))
+                return scenario
 
             except (json.JSONDecodeError, ValueError) as e:
                 last_error = e
                 if attempt < max_retries - 1:
-                    print(f"  Attempt {attempt + 1} failed: {e}. Retrying...")
+                    logger.warning(f"  Attempt {attempt + 1} aborted: {e}. Retrying...")
+                self._gate_failed("scenario", attempt, attempt < max_retries - 1)
                 continue
 
         raise last_error
 
-    def _validate_and_build(self, data: dict) -> MultiLevelScenario:
-        """Validate data and build MultiLevelScenario object."""
-        required_fields = ["title", "aoc_theme", "levels", "day", "year"]
+    def _batch_id_for(self, pending: dict[str, tuple[AoCPuzzle, str]], retry: int = 0) -> str:
+        """
+        Resume the persisted batch if it covers exactly these requests on the
+        same model, else submit a new one on the "scenario" route's model for this retry.
+        """
+        model = self.routes["scenario"].model_for(retry)
+        request_keys = {custom_id: cache_key for custom_id, (_, cache_key) in pending.items()}
+        state = self.state_store.get_json(self.BATCH_STATE_KEY)
+        if state is not None and state.get("requests") == request_keys and state.get("model", model) == model:
+            logger.info(f"  Resuming batch {state['batch_id']}")
+            return state["batch_id"]
+
+        requests = []
+        for custom_id, (puzzle, _) in pending.items():
+            user_prompt = self._build_generation_prompt(puzzle)
+            requests.append({
+                "custom_id": custom_id,
+                "params": {
+                    "model": model,
+                    "max_tokens": self._plan(user_prompt, SCENARIO_LABELS, self.MAX_TOKENS, retry=retry),
+                    "system": self._build_system(),
+                    "messages": self._messages(user_prompt),
+                },
+            })
+        batch = self.client.messages.batches.create(requests=requests)
+        self.state_store.put_json(
+            self.BATCH_STATE_KEY, {"batch_id": batch.id, "requests": request_keys, "model": model}
+        )
+        logger.info(f"  Submitted batch {batch.id} ({len(pending)} requests on {model})")
+        return batch.id
+
+    def _wait_for_batch(self, batch_id: str) -> None:
+        """Poll until the batch has ended, backing off between polls."""
+        delay = self.BATCH_POLL_INITIAL
+        while True:
+            batch = self.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                return
+            counts = batch.request_counts
+            logger.info(
+                f"  Batch {batch_id}: {counts.processing} processing, "
+                f"{counts.succeeded} succeeded, {counts.errored} errored"
+            )
+            time.sleep(delay)
+            delay = min(delay * 2, self.BATCH_POLL_MAX)
+
+    def generate_batch(self, puzzles: list[AoCPuzzle], max_rounds: int = 3) -> dict[int, MultiLevelScenario]:
+        """
+        Generate many days through the Message Batches API. Every day that
+        isn't already cached is submitted as one batch; results go through
+        the same validation as generate(), and only the requests that errored
+        or failed validation are resubmitted, up to `max_rounds` batches,
+        escalating along the "scenario" route like generate()'s retries.
+
+        Returns scenarios by day. Days that still failed are left out.
+        """
+        scenarios: dict[int, MultiLevelScenario] = {}
+        pending: dict[str, tuple[AoCPuzzle, str]] = {}  # custom_id -> (puzzle, result cache key)
+        for puzzle in puzzles:
+            cache_key = self._result_key("single", puzzle, SINGLE_ROUTES)
+            if (cached := self._cached_result(cache_key)) is not None:
+                scenarios[puzzle.day] = cached
+            else:
+                pending[f"day-{puzzle.year}-{puzzle.day:02d}"] = (puzzle, cache_key)
+
+        for batch_round in range(max_rounds):
+            if not pending:
+                break
+            if batch_round:
+                logger.warning(f"  Resubmitting {len(pending)} failed request(s)...")
+
+            batch_id = self._batch_id_for(pending, batch_round)
+            self._wait_for_batch(batch_id)
+
+            for entry in self.client.messages.batches.results(batch_id):
+                if entry.custom_id not in pending:
+                    continue
+                puzzle, cache_key = pending[entry.custom_id]
+                try:
+                    if entry.result.type != "succeeded":
+                        raise ValueError(f"request {entry.result.type}")
+                    message = entry.result.message
+                    self._record_usage(message.usage)
+                    response_text = "".join(block.text for block in message.content if block.type == "text")
+                    self._observe_output(response_text, message.usage, message.stop_reason, SCENARIO_LABELS)
+                    if message.stop_reason == "max_tokens":
+                        # Finish it directly rather than resubmitting the whole request
+                        logger.info(f"  {entry.custom_id} stopped at max_tokens, continuing...")
+                        user_prompt = self._build_generation_prompt(puzzle)
+                        response_text = self._complete(
+                            user_prompt,
+                            self._plan(user_prompt, SCENARIO_LABELS, self.MAX_TOKENS, retry=batch_round),
+                            retry=batch_round,
+                            partial=response_text.rstrip(),
+                            labels=SCENARIO_LABELS,
+                        )
+
+                    data = self._extract_json(response_text)
+                    data["day"] = puzzle.day
+                    data["year"] = puzzle.year
+                    data["part2_included"] = puzzle.part2_unlocked
+                    scenario = self._repair_and_build(puzzle, data)
+                except (json.JSONDecodeError, ValueError) as e:
+                    logger.warning(f"  {entry.custom_id} failed: {e}")
+                    self.route_stats.failed("scenario", self.routes["scenario"].model_for(batch_round))
+                    continue
+
+                self._store_result(cache_key, response_text, scenario, message.model)
+                scenarios[puzzle.day] = scenario
+                del pending[entry.custom_id]
+
+            self.state_store.delete(self.BATCH_STATE_KEY)
+
+        if pending:
+            logger.warning(f"  Batch generation failed for: {', '.join(sorted(pending))}")
+        return scenarios
+
+    def _generate_skeleton(self, puzzle: AoCPuzzle, max_retries: int) -> tuple[dict, str]:
+        """Generate the title/theme/continuity hooks shared by all levels. Returns them and the model used."""
+        user_prompt = self._build_skeleton_prompt(puzzle)
 
-        for field_name in required_fields:
-            if field_name not in data:
-                raise ValueError(f"Missing required field: {field_name}")
+        last_error = None
+        for attempt in range(max_retries):
+            try:
+                max_tokens = self._plan(user_prompt, ["skeleton"], self.SKELETON_MAX_TOKENS, "skeleton", attempt)
+                skeleton = self._extract_json(
+                    self._complete(user_prompt, max_tokens, "skeleton", attempt, labels=["skeleton"])
+                )
+                for field_name in ["title", "aoc_theme"]:
+                    if field_name not in skeleton:
+                        raise ValueError(f"Missing required field: {field_name}")
+                return skeleton, self.routes["skeleton"].model_for(attempt)
+            except (json.JSONDecodeError, ValueError) as e:
+                last_error = e
+                if attempt < max_retries - 1:
+                    logger.warning(f"  Skeleton attempt {attempt + 1} failed: {e}. Retrying...")
+                self._gate_failed("skeleton", attempt, attempt < max_retries - 1)
+                continue
 
-        # Validate we have all 6 levels
-        expected_levels = ["level_1", "level_2", "level_3", "level_4", "level_5", "level_6"]
-        for level_key in expected_levels:
-            if level_key not in data["levels"]:
-                raise ValueError(f"Missing required level: {level_key}")
+        raise last_error
 
-        # Build levels
-        levels = {}
-        for level_key in expected_levels:
-            level_data = data["levels"][level_key]
-
-            # Ensure at least one solution step has victory=True
-            solution_steps = level_data.get("solution_steps", [])
-            has_victory = any(step.get("victory", False) for step in solution_steps)
-            if not has_victory and solution_steps:
-                solution_steps[-1]["victory"] = True
-
-            # Build NPCs
-            npcs = [NPC(**npc) for npc in level_data.get("npcs", [])]
-
-            # Build solution steps
-            steps = []
-            for step_data in solution_steps:
-                step_data.setdefault("unlocks", None)
-                step_data.setdefault("victory", False)
-                step_data.setdefault("state_changes", {})
-                steps.append(SolutionStep(**step_data))
-
-            levels[level_key] = LevelScenario(
-                career_title=level_data.get("career_title", ""),
-                setup_narrative=level_data.get("setup_narrative", ""),
-                initial_state=level_data.get("initial_state", {"morale": 50, "budget": 100}),
-                npcs=npcs,
-                solution_steps=steps,
-                optimal_turn_count=level_data.get("optimal_turn_count", 4),
-                consequences=level_data.get("consequences", {}),
-                hints=level_data.get("hints", []),
-                victory_message=level_data.get("victory_message", "Congratulations!")
+    def _generate_level(
+        self, puzzle: AoCPuzzle, skeleton: dict, level_key: str, max_retries: int
+    ) -> tuple[dict, str]:
+        """
+        Generate a single level on its route's model and check it against the
+        quality gate, escalating to the next model on failure. Returns its JSON
+        data and the model that wrote it.
+        """
+        user_prompt = self._build_level_prompt(puzzle, skeleton, level_key)
+
+        last_error = None
+        for attempt in range(max_retries):
+            try:
+                max_tokens = self._plan(user_prompt, [level_key], self.LEVEL_MAX_TOKENS, level_key, attempt)
+                level_data = self._extract_json(
+                    self._complete(user_prompt, max_tokens, level_key, attempt, labels=[level_key])
+                )
+                # Fail here, inside the retry loop, rather than when the day is assembled
+                self._check_level(level_key, level_data)
+                return level_data, self.routes[level_key].model_for(attempt)
+            except (json.JSONDecodeError, ValueError) as e:
+                last_error = e
+                if attempt < max_retries - 1:
+                    logger.warning(f"  {level_key} attempt {attempt + 1} failed: {e}. Retrying...")
+                self._gate_failed(level_key, attempt, attempt < max_retries - 1)
+                continue
+
+        raise last_error
+
+    def _warm_prompt_cache(self, model: str) -> None:
+        """
+        Write the shared system blocks to `model`'s prompt cache with a
+        one-token request. Failures only cost the cache hit, so they are logged.
+        """
+        started = time.monotonic()
+        try:
+            response = self.client.messages.create(
+                model=model,
+                max_tokens=1,
+                messages=self._messages("Reply with OK."),
+                system=self._build_system(),
             )
+        except Exception as e:
+            logger.warning(f"  Prompt cache warm-up on {model} failed: {e}")
+            return
+        self._record_usage(response.usage)
+        self.route_stats.record("warm-up", model, time.monotonic() - started, response.usage)
+
+    def _models_to_warm(self) -> list[str]:
+        """
+        Models other than the skeleton's that two or more levels start on.
+        Prompt caches are per model, so the skeleton only warms its own; a
+        model with a single level request writes its cache either way.
+        """
+        first_models = [self.routes[level_key].model_for(0) for level_key in LEVEL_KEYS]
+        skeleton_model = self.routes["skeleton"].model_for(0)
+        return sorted({model for model in first_models if model != skeleton_model and first_models.count(model) > 1})
+
+    def generate_parallel(
+        self, puzzle: AoCPuzzle, max_retries: int = 3, max_workers: int = 6
+    ) -> MultiLevelScenario:
+        """
+        Generate the day's shared skeleton once, then all six levels concurrently.
+        A malformed level is retried on its own instead of discarding the whole day.
+        While the skeleton is written, the prompt cache of each other model
+        the levels use is warmed, so the concurrent level requests read it
+        instead of each paying a cache write.
+        """
+        cache_key = self._result_key("parallel", puzzle, PARALLEL_ROUTES)
+        if (cached := self._cached_result(cache_key)) is not None:
+            return cached
+
+        warm_models = self._models_to_warm()
+        with ThreadPoolExecutor(max_workers=max(1, len(warm_models))) as pool:
+            warmups = [pool.submit(self._warm_prompt_cache, model) for model in warm_models]
+            skeleton, skeleton_model = self._generate_skeleton(puzzle, max_retries)
+            for warmup in warmups:
+                warmup.result()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                level_key: pool.submit(self._generate_level, puzzle, skeleton, level_key, max_retries)
+                for level_key in LEVEL_KEYS
+            }
+            results = {level_key: future.result() for level_key, future in futures.items()}
+        levels = {level_key: level_data for level_key, (level_data, _) in results.items()}
+        models = {"skeleton": skeleton_model, **{level_key: model for level_key, (_, model) in results.items()}}
+
+        data = {
+            "title": skeleton["title"],
+            "aoc_theme": skeleton["aoc_theme"],
+            "continuity_hooks": skeleton.get("continuity_hooks"),
+            "levels": levels,
+            "day": puzzle.day,
+            "year": puzzle.year,
+            "part2_included": puzzle.part2_unlocked,
+        }
+        scenario = self._validate_and_build(data)
+        # Responses are per level here; keep the assembled JSON they produced
+        self._store_result(cache_key, json.dumps(data), scenario, models)
+        return scenario
+
+    def _validate_and_build(self, data: dict) -> MultiLevelScenario:
+        """Build the scenario (see _build_scenario) and add its sizes to the output budget history."""
+        scenario = self._build_scenario(data)
+        self._record_sizes(data)
+        return scenario
+
+    def _build_scenario(self, data: dict) -> MultiLevelScenario:
+        """Validate data against the scenario schema and build MultiLevelScenario object."""
+        if isinstance(data.get("levels"), dict):
+            for level_data in data["levels"].values():
+                ensure_victory_step(level_data)
+        check_scenario(data)
+
+        # Build levels
+        levels = {level_key: self._build_level(data["levels"][level_key]) for level_key in LEVEL_KEYS}
 
         return MultiLevelScenario(
             day=data["day"],
@@ -335,45 +1221,238 @@ Return ONLY valid JSON matching the specified format with ALL 6 LEVELS. No markd
             title=data["title"],
             aoc_theme=data["aoc_theme"],
             levels=levels,
-            continuity_hooks=data.get("continuity_hooks")
+            continuity_hooks=data.get("continuity_hooks"),
+            part2_included=data.get("part2_included", True),
         )
 
+    def _record_sizes(self, data: dict) -> None:
+        """Add a valid scenario's level and skeleton sizes to the output budget history (real-model output only)."""
+        if not self.real_model:
+            return
+        for level_key in LEVEL_KEYS:
+            self.budget.record(level_key, data["levels"][level_key])
+        self.budget.record("skeleton", {key: data.get(key) for key in ("title", "aoc_theme", "continuity_hooks")})
+        self.budget.save()
+
+    def _build_level(self, level_data: dict) -> LevelScenario:
+        """Build one LevelScenario from its JSON data."""
+        ensure_victory_step(level_data)
+        # Fresh generations get playable defaults for the optional fields
+        return LevelScenario.from_dict({
+            "initial_state": {"morale": 50, "budget": 100},
+            "victory_message": "Congratulations!",
+            **level_data,
+        })
+
+    def _targeted_levels(self, feedback: str) -> list[str]:
+        """
+        Levels the feedback names explicitly ("level 3", "level_3"); all of
+        them if none. Career titles don't count: "the manager dialogue" is
+        as likely to be about an NPC as about the Manager level.
+        """
+        targeted = [
+            level_key
+            for level_key in LEVEL_KEYS
+            if re.search(rf"\blevel[ _]?{level_key.split('_')[1]}\b", feedback, re.IGNORECASE)
+        ]
+        if targeted:
+            return targeted
+        titles = [
+            level_key
+            for level_key, career_title in CAREER_TITLES.items()
+            if re.search(rf"\b{re.escape(career_title)}\b", feedback, re.IGNORECASE)
+        ]
+        if titles:
+            logger.info(
+                f"  Feedback mentions {', '.join(CAREER_TITLES[level_key] for level_key in titles)}; "
+                f"revising all levels (pass levels={titles} to narrow it)"
+            )
+        return list(LEVEL_KEYS)
+
+    def _build_feedback_prompt(
+        self,
+        puzzle: AoCPuzzle,
+        previous: dict,
+        feedback: str,
+        levels: list[str],
+    ) -> str:
+        """Build the prompt revising only `levels` of a previous scenario."""
+        revised = {level_key: previous["levels"][level_key] for level_key in levels}
+        return f"""{self._build_puzzle_context(puzzle)}
+
+---
+
+## SHARED SCENARIO
+
+**Title**: {previous["title"]}
+**Theme**: {previous["aoc_theme"]}
+
+---
+
+## Previous Attempt (levels being revised)
+
+{json.dumps(revised, separators=(",", ":"))}
+
+## Feedback
+
+{feedback}
+
+---
+
+## YOUR TASK
+
+The other levels are being kept as they are. Rewrite ONLY the levels above so they address this feedback, keeping the shared title and theme. Use characters from the OFFICIAL CAST DOCUMENT in the system prompt (exact names and titles!).
+
+Return ONLY a JSON object whose keys are exactly: {", ".join(f'"{key}"' for key in levels)}. Each value is the complete level object. No markdown code blocks, no explanation."""
+
     def regenerate_with_feedback(
         self,
         puzzle: AoCPuzzle,
         previous_scenario: MultiLevelScenario,
-        feedback: str
+        feedback: str,
+        levels: list[str] | None = None,
     ) -> MultiLevelScenario:
-        """Regenerate scenario with human feedback."""
-        user_prompt = self._build_generation_prompt(puzzle)
-        user_prompt += f"""
+        """
+        Regenerate scenario with human feedback.
+
+        Only the levels in `levels` (default: the ones the feedback names as
+        "level N", or all six) are sent back and regenerated; the rest are
+        kept locally.
+        The previous attempt is sent as minified JSON.
+        """
+        previous = previous_scenario.to_dict()
+        levels = self._targeted_levels(feedback) if levels is None else levels
+
+        if len(levels) == len(LEVEL_KEYS):
+            user_prompt = self._build_generation_prompt(puzzle)
+            user_prompt += f"""
 
 ## Previous Attempt
 
-{previous_scenario.to_json()}
+{json.dumps(previous, separators=(",", ":"))}
 
 ## Feedback
 
 {feedback}
 
 Please generate an improved version addressing this feedback."""
+            route = "scenario"
+            max_tokens = self._plan(user_prompt, SCENARIO_LABELS, self.MAX_TOKENS)
+        else:
+            user_prompt = self._build_feedback_prompt(puzzle, previous, feedback, levels)
+            route = "repair"
+            max_tokens = self._plan(user_prompt, levels, self.LEVEL_MAX_TOKENS * len(levels), route)
+
+        # Compare with the old payload: full prompt plus all six levels pretty-printed
+        tokens = self.budget.estimate(user_prompt)
+        baseline = self.budget.estimate(
+            self._build_generation_prompt(puzzle) + previous_scenario.to_json() + feedback
+        )
+        logger.info(
+            f"  Feedback prompt: ~{tokens} tokens instead of ~{baseline} "
+            f"({1 - tokens / baseline:.0%} smaller, revising {', '.join(levels)})"
+        )
 
-        response = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=16000,
-            messages=[
-                {"role": "user", "content": user_prompt}
-            ],
-            system=self.scenario_prompt,
+        response_text = self._complete(
+            user_prompt, max_tokens, route, labels=SCENARIO_LABELS if route == "scenario" else levels
         )
+        data = self._extract_json(response_text)
 
-        response_text = ""
-        for block in response.content:
-            if block.type == "text":
-                response_text += block.text
+        if len(levels) < len(LEVEL_KEYS):
+            # Splice the revised levels into the untouched ones
+            revised = data
+            data = dict(previous, levels=dict(previous["levels"]))
+            for level_key in levels:
+                if level_key in revised:
+                    data["levels"][level_key] = revised[level_key]
+                else:
+                    data["levels"].pop(level_key)  # Let repair regenerate it
 
-        data = self._extract_json(response_text)
         data["day"] = puzzle.day
         data["year"] = puzzle.year
+        data["part2_included"] = puzzle.part2_unlocked
+
+        return self._repair_and_build(puzzle, data)
+
+    def _build_part2_prompt(self, puzzle: AoCPuzzle, previous: dict) -> str:
+        """Build the prompt rewriting PART2_LEVELS of a scenario generated before Part 2 was available."""
+        kept = "\n".join(
+            f"- {level_key} ({CAREER_TITLES[level_key]}): {previous['levels'][level_key]['setup_narrative']}"
+            for level_key in LEVEL_KEYS
+            if level_key not in PART2_LEVELS
+        )
+        rewritten = {level_key: previous["levels"][level_key] for level_key in PART2_LEVELS}
+        return f"""{self._build_puzzle_context(puzzle)}
+
+---
+
+## PUBLISHED SCENARIO (written from Part One only)
+
+**Title**: {previous["title"]}
+**Theme**: {previous["aoc_theme"]}
 
-        return self._validate_and_build(data)
+Levels staying as published:
+
+{kept}
+
+Levels to rewrite:
+
+{json.dumps(rewritten, separators=(",", ":"))}
+
+---
+
+## YOUR TASK
+
+Part Two of the puzzle is now available (see above). Players already have the published scenario, so keep the title and the levels staying as published. Rewrite ONLY {", ".join(PART2_LEVELS)} so they escalate with the Part Two twist at their career level's scope, and update the theme so it describes the mechanic across both parts. Use characters from the OFFICIAL CAST DOCUMENT in the system prompt (exact names and titles!).
+
+Return ONLY a JSON object whose keys are exactly: "aoc_theme", {", ".join(f'"{key}"' for key in PART2_LEVELS)}. Each level value is the complete level object. No markdown code blocks, no explanation."""
+
+    def refresh_for_part2(
+        self, puzzle: AoCPuzzle, previous_scenario: MultiLevelScenario, max_retries: int = 3
+    ) -> MultiLevelScenario:
+        """
+        Update a scenario generated from Part 1 alone now that `puzzle`
+        includes Part 2. Only the theme and PART2_LEVELS are regenerated; the
+        title and lower levels players have already seen are kept.
+        """
+        previous = previous_scenario.to_dict()
+        cache_key = self._result_key("part2", puzzle, PART2_ROUTES, extra=previous)
+        if (cached := self._cached_result(cache_key)) is not None:
+            return cached
+
+        user_prompt = self._build_part2_prompt(puzzle, previous)
+
+        last_error = None
+        for attempt in range(max_retries):
+            try:
+                max_tokens = self._plan(
+                    user_prompt, PART2_LEVELS, self.LEVEL_MAX_TOKENS * len(PART2_LEVELS), "part2", attempt
+                )
+                response_text = self._complete(user_prompt, max_tokens, "part2", attempt, labels=PART2_LEVELS)
+                revised = self._extract_json(response_text)
+
+                # Splice the rewritten levels into the published ones
+                data = dict(previous, levels=dict(previous["levels"]))
+                if isinstance(revised.get("aoc_theme"), str):
+                    data["aoc_theme"] = revised["aoc_theme"]
+                for level_key in PART2_LEVELS:
+                    if level_key in revised:
+                        data["levels"][level_key] = revised[level_key]
+                    else:
+                        data["levels"].pop(level_key)  # Let repair regenerate it
+                data["day"] = puzzle.day
+                data["year"] = puzzle.year
+                data["part2_included"] = puzzle.part2_unlocked
+
+                scenario = self._repair_and_build(puzzle, data)
+                self._store_result(cache_key, response_text, scenario, self.routes["part2"].model_for(attempt))
+                return scenario
+
+            except (json.JSONDecodeError, ValueError) as e:
+                last_error = e
+                if attempt < max_retries - 1:
+                    logger.warning(f"  Part 2 refresh attempt {attempt + 1} failed: {e}. Retrying...")
+                self._gate_failed("part2", attempt, attempt < max_retries - 1)
+                continue
+
+        raise last_error
@@ -0,0 +1,226 @@
+"""
+Schema validation for the multi-level scenario format
+
+The schema is compiled once, at import, into nested checker functions. A
+validation pass walks the document a single time and collects every
+violation with its JSON path (e.g. "$.levels.level_2.npcs[0].secret"),
+instead of stopping at the first bad field. Generation, publishing and
+loading all use it.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable
+
+LEVEL_KEYS = ["level_1", "level_2", "level_3", "level_4", "level_5", "level_6"]
+
+# check(value, path, violations) appends a Violation for each problem found
+Checker = Callable[[Any, str, list], None]
+
+
+@dataclass
+class Violation:
+    path: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}"
+
+
+class SchemaError(ValueError):
+    """A document violates the scenario schema. All violations are in `violations`."""
+
+    def __init__(self, violations: list[Violation]):
+        self.violations = violations
+        shown = "; ".join(map(str, violations[:5]))
+        more = f" (+{len(violations) - 5} more)" if len(violations) > 5 else ""
+        super().__init__(f"{len(violations)} schema violation(s): {shown}{more}")
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    return {dict: "object", list: "array", str: "string", bool: "boolean"}.get(type(value), type(value).__name__)
+
+
+def _typed(expected: type, name: str) -> Checker:
+    def check(value, path, violations):
+        if not isinstance(value, expected):
+            violations.append(Violation(path, f"expected {name}, got {_type_name(value)}"))
+    return check
+
+
+def string() -> Checker:
+    return _typed(str, "string")
+
+
+def integer() -> Checker:
+    def check(value, path, violations):
+        # bool is an int subclass, but true/false are never valid numbers here
+        if not isinstance(value, int) or isinstance(value, bool):
+            violations.append(Violation(path, f"expected integer, got {_type_name(value)}"))
+    return check
+
+
+def boolean() -> Checker:
+    return _typed(bool, "boolean")
+
+
+def anything() -> Checker:
+    def check(value, path, violations):
+        pass
+    return check
+
+
+def nullable(inner: Checker) -> Checker:
+    def check(value, path, violations):
+        if value is not None:
+            inner(value, path, violations)
+    return check
+
+
+def pattern() -> Checker:
+    """A string that compiles as a regular expression."""
+    def check(value, path, violations):
+        if not isinstance(value, str):
+            violations.append(Violation(path, f"expected string, got {_type_name(value)}"))
+            return
+        try:
+            re.compile(value)
+        except re.error as e:
+            violations.append(Violation(path, f"invalid regex: {e}"))
+    return check
+
+
+def array(item: Checker, min_items: int = 0) -> Checker:
+    def check(value, path, violations):
+        if not isinstance(value, list):
+            violations.append(Violation(path, f"expected array, got {_type_name(value)}"))
+            return
+        if len(value) < min_items:
+            violations.append(Violation(path, f"expected at least {min_items} item(s)"))
+        for i, entry in enumerate(value):
+            item(entry, f"{path}[{i}]", violations)
+    return check
+
+
+def mapping(item: Checker) -> Checker:
+    """An object with arbitrary keys whose values all match `item`."""
+    def check(value, path, violations):
+        if not isinstance(value, dict):
+            violations.append(Violation(path, f"expected object, got {_type_name(value)}"))
+            return
+        for key, entry in value.items():
+            item(entry, f"{path}.{key}", violations)
+    return check
+
+
+def obj(
+    required: dict[str, Checker],
+    optional: dict[str, Checker] | None = None,
+    closed: bool = False,
+    rules: tuple[Checker, ...] = (),
+) -> Checker:
+    """
+    An object with known fields. `closed` objects may not carry other keys
+    (they are built with **kwargs); `rules` run on the whole object once its
+    fields are valid.
+    """
+    optional = optional or {}
+    known = required.keys() | optional.keys()
+
+    def check(value, path, violations):
+        if not isinstance(value, dict):
+            violations.append(Violation(path, f"expected object, got {_type_name(value)}"))
+            return
+        before = len(violations)
+        for name, field_check in required.items():
+            if name in value:
+                field_check(value[name], f"{path}.{name}", violations)
+            else:
+                violations.append(Violation(f"{path}.{name}", "missing required field"))
+        for name, field_check in optional.items():
+            if name in value:
+                field_check(value[name], f"{path}.{name}", violations)
+        if closed:
+            for name in value.keys() - known:
+                violations.append(Violation(f"{path}.{name}", "unexpected field"))
+        if len(violations) == before:
+            for rule in rules:
+                rule(value, path, violations)
+    return check
+
+
+def _has_victory_step(level, path, violations):
+    if not any(step.get("victory") for step in level["solution_steps"]):
+        violations.append(Violation(f"{path}.solution_steps", 'no step has "victory": true'))
+
+
+NPC_SCHEMA = obj(
+    required={"name": string(), "role": string(), "quirk": string(), "secret": string()},
+    closed=True,
+)
+
+STEP_SCHEMA = obj(
+    required={
+        "step": integer(),
+        "description": string(),
+        "action_patterns": array(pattern(), min_items=1),
+        "narrative_result": string(),
+    },
+    optional={
+        "state_changes": mapping(anything()),
+        "unlocks": nullable(string()),
+        "victory": boolean(),
+    },
+    closed=True,
+)
+
+LEVEL_SCHEMA = obj(
+    required={
+        "career_title": string(),
+        "setup_narrative": string(),
+        "npcs": array(NPC_SCHEMA),
+        "solution_steps": array(STEP_SCHEMA, min_items=1),
+    },
+    optional={
+        "initial_state": mapping(anything()),
+        "optimal_turn_count": integer(),
+        "consequences": mapping(string()),
+        "hints": array(string()),
+        "victory_message": string(),
+    },
+    rules=(_has_victory_step,),
+)
+
+SCENARIO_SCHEMA = obj(
+    required={
+        "day": integer(),
+        "year": integer(),
+        "title": string(),
+        "aoc_theme": string(),
+        "levels": obj(required={level_key: LEVEL_SCHEMA for level_key in LEVEL_KEYS}),
+    },
+    optional={"continuity_hooks": nullable(mapping(anything())), "part2_included": boolean()},
+)
+
+
+def validate_scenario(data: Any) -> list[Violation]:
+    """Every schema violation in a multi-level scenario document."""
+    violations: list[Violation] = []
+    SCENARIO_SCHEMA(data, "$", violations)
+    return violations
+
+
+def validate_level(level_data: Any, level_key: str) -> list[Violation]:
+    """Every schema violation in one level, with paths relative to the whole document."""
+    violations: list[Violation] = []
+    LEVEL_SCHEMA(level_data, f"$.levels.{level_key}", violations)
+    return violations
+
+
+def check_scenario(data: Any) -> None:
+    """Raise SchemaError listing every violation, if there are any."""
+    violations = validate_scenario(data)
+    if violations:
+        raise SchemaError(violations)
@@ -0,0 +1,280 @@
+"""
+Answer submission bookkeeping: structured results, a ledger of past guesses
+and a persistent queue that resubmits once AoC's cooldown has passed
+"""
+
+import re
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger (
+    year INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    part INTEGER NOT NULL,
+    answer TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    PRIMARY KEY (year, day, part, answer)
+);
+CREATE TABLE IF NOT EXISTS queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    part INTEGER NOT NULL,
+    answer TEXT NOT NULL,
+    not_before REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT,
+    message TEXT
+);
+CREATE TABLE IF NOT EXISTS throttle (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    until REAL NOT NULL
+);
+"""
+
+WAIT_PATTERN = re.compile(r"You have (?:(\d+)m)?\s*(?:(\d+)s)? left to wait")
+PENALTY_PATTERN = re.compile(r"please wait (one|\d+) minutes? before trying again", re.IGNORECASE)
+
+
+class SubmissionStatus(Enum):
+    CORRECT = "correct"
+    INCORRECT = "incorrect"
+    TOO_LOW = "too_low"
+    TOO_HIGH = "too_high"
+    RATE_LIMITED = "rate_limited"
+    WRONG_LEVEL = "wrong_level"
+    UNKNOWN = "unknown"
+
+
+REJECTED = {SubmissionStatus.INCORRECT, SubmissionStatus.TOO_LOW, SubmissionStatus.TOO_HIGH}
+
+
+@dataclass
+class SubmissionResult:
+    status: SubmissionStatus
+    message: str
+    retry_after: Optional[float] = None  # Seconds before AoC accepts another answer
+    local: bool = False  # Decided from the ledger without contacting AoC
+
+    @property
+    def success(self) -> bool:
+        return self.status == SubmissionStatus.CORRECT
+
+
+def parse_submission_response(text: str) -> SubmissionResult:
+    """Turn the text of AoC's answer page into a structured result."""
+    penalty = PENALTY_PATTERN.search(text)
+    retry_after = None
+    if penalty:
+        minutes = 1 if penalty.group(1) == "one" else int(penalty.group(1))
+        retry_after = minutes * 60.0
+
+    if "That's the right answer" in text:
+        return SubmissionResult(SubmissionStatus.CORRECT, "Correct!")
+    elif "That's not the right answer" in text:
+        # Try to extract hint
+        if "too low" in text.lower():
+            return SubmissionResult(SubmissionStatus.TOO_LOW, "Incorrect - answer is too low", retry_after)
+        elif "too high" in text.lower():
+            return SubmissionResult(SubmissionStatus.TOO_HIGH, "Incorrect - answer is too high", retry_after)
+        return SubmissionResult(SubmissionStatus.INCORRECT, "Incorrect", retry_after)
+    elif "You gave an answer too recently" in text:
+        # Extract wait time
+        match = WAIT_PATTERN.search(text)
+        if match and (match.group(1) or match.group(2)):
+            mins = int(match.group(1)) if match.group(1) else 0
+            secs = int(match.group(2)) if match.group(2) else 0
+            return SubmissionResult(
+                SubmissionStatus.RATE_LIMITED, f"Rate limited - wait {mins}m {secs}s", mins * 60.0 + secs
+            )
+        return SubmissionResult(SubmissionStatus.RATE_LIMITED, "Rate limited - please wait", 60.0)
+    elif "You don't seem to be solving the right level" in text:
+        return SubmissionResult(SubmissionStatus.WRONG_LEVEL, "Already solved or wrong part")
+    else:
+        return SubmissionResult(SubmissionStatus.UNKNOWN, f"Unknown response: {text[:200]}")
+
+
+def _as_int(answer: str) -> Optional[int]:
+    try:
+        return int(answer.strip())
+    except ValueError:
+        return None
+
+
+class _Database:
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+
+class AnswerLedger(_Database):
+    """
+    Every answer AoC has judged, per (year, day, part).
+
+    Used to refuse answers that are certain to be wrong - repeats of rejected
+    guesses, or numbers outside the too-low/too-high bounds seen so far -
+    without spending a submission and its cooldown.
+    """
+
+    def record(self, year: int, day: int, part: int, answer: str, result: SubmissionResult) -> None:
+        """Remember AoC's verdict on an answer."""
+        if result.status not in REJECTED and result.status != SubmissionStatus.CORRECT:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ledger VALUES (?, ?, ?, ?, ?, ?)",
+                (year, day, part, str(answer).strip(), result.status.value, time.time()),
+            )
+
+    def bounds(self, year: int, day: int, part: int) -> tuple[Optional[int], Optional[int]]:
+        """Return (highest answer known too low, lowest answer known too high)."""
+        low = high = None
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT answer, status FROM ledger WHERE year = ? AND day = ? AND part = ?",
+                (year, day, part),
+            ).fetchall()
+        for row in rows:
+            value = _as_int(row["answer"])
+            if value is None:
+                continue
+            if row["status"] == SubmissionStatus.TOO_LOW.value and (low is None or value > low):
+                low = value
+            elif row["status"] == SubmissionStatus.TOO_HIGH.value and (high is None or value < high):
+                high = value
+        return low, high
+
+    def check(self, year: int, day: int, part: int, answer: str) -> Optional[SubmissionResult]:
+        """Judge an answer locally if the ledger already settles it, else return None."""
+        answer = str(answer).strip()
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT answer, status FROM ledger WHERE year = ? AND day = ? AND part = ?",
+                (year, day, part),
+            ).fetchall()
+
+        for row in rows:
+            if row["status"] == SubmissionStatus.CORRECT.value:
+                if row["answer"] == answer:
+                    return SubmissionResult(SubmissionStatus.CORRECT, "Correct! (already accepted)", local=True)
+                return SubmissionResult(
+                    SubmissionStatus.INCORRECT, f"Incorrect - {row['answer']} was already accepted", local=True
+                )
+            if row["answer"] == answer:
+                return SubmissionResult(
+                    SubmissionStatus(row["status"]), "Incorrect - already rejected by AoC", local=True
+                )
+
+        value = _as_int(answer)
+        if value is None:
+            return None
+        low, high = self.bounds(year, day, part)
+        if low is not None and value <= low:
+            return SubmissionResult(
+                SubmissionStatus.TOO_LOW, f"Incorrect - answer is too low (must be above {low})", local=True
+            )
+        if high is not None and value >= high:
+            return SubmissionResult(
+                SubmissionStatus.TOO_HIGH, f"Incorrect - answer is too high (must be below {high})", local=True
+            )
+        return None
+
+
+class SubmissionQueue(_Database):
+    """
+    Persistent queue of answers waiting to be submitted.
+
+    Rate-limited submissions are rescheduled for exactly when AoC says the
+    cooldown ends, and the cooldown is remembered so no process on this host
+    submits before then. AoC throttles answers per account across every
+    year and puzzle, so the database is per account (see AoCClient) and the
+    cooldown is a single row, not keyed by year.
+    """
+
+    def enqueue(self, year: int, day: int, part: int, answer: str) -> int:
+        """Queue an answer for submission as soon as allowed. Returns the queue id."""
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO queue (year, day, part, answer, not_before) VALUES (?, ?, ?, ?, ?)",
+                (year, day, part, str(answer).strip(), self.cooldown_until()),
+            )
+            return cursor.lastrowid
+
+    def cooldown_until(self) -> float:
+        """Timestamp before which AoC will refuse this account's answers (0 if none)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT until FROM throttle WHERE id = 0").fetchone()
+        return row["until"] if row else 0.0
+
+    def set_cooldown(self, retry_after: float) -> None:
+        """Record that AoC will refuse this account's answers for the next `retry_after` seconds."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO throttle VALUES (0, ?)", (time.time() + retry_after,))
+
+    def pending(self, year: int) -> list[sqlite3.Row]:
+        """Unfinished entries, earliest first."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT * FROM queue WHERE year = ? AND status IS NULL ORDER BY not_before, id",
+                (year,),
+            ).fetchall()
+
+    def _reschedule(self, entry_id: int, not_before: float) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE queue SET not_before = ?, attempts = attempts + 1 WHERE id = ?",
+                (not_before, entry_id),
+            )
+
+    def _finish(self, entry_id: int, result: SubmissionResult) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE queue SET status = ?, message = ?, attempts = attempts + 1 WHERE id = ?",
+                (result.status.value, result.message, entry_id),
+            )
+
+    def drain(
+        self,
+        year: int,
+        submit: Callable[[int, int, str], SubmissionResult],
+        wait: bool = True,
+    ) -> list[SubmissionResult]:
+        """
+        Submit every pending entry whose time has come.
+        With `wait`, sleeps until each rescheduled entry is due instead of returning early.
+        """
+        results = []
+        while True:
+            entries = self.pending(year)
+            if not entries:
+                return results
+
+            entry = entries[0]
+            delay = entry["not_before"] - time.time()
+            if delay > 0:
+                if not wait:
+                    return results
+                time.sleep(delay)
+                continue
+
+            result = submit(entry["day"], entry["part"], entry["answer"])
+            if result.status == SubmissionStatus.RATE_LIMITED:
+                self._reschedule(entry["id"], time.time() + (result.retry_after or 60.0))
+                continue
+
+            self._finish(entry["id"], result)
+            results.append(result)
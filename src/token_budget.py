@@ -0,0 +1,188 @@
+"""
+Token budgets for generation requests
+
+Output budgets come from the sizes of past responses, per level, so a
+request asks for what its levels have needed (plus headroom) instead of one
+fixed ceiling; a response that stops at max_tokens raises the budget for its
+levels next time. Prompts are counted before sending, either locally from a
+chars-per-token ratio calibrated against real usage or with the API's
+count_tokens endpoint, whose answers are cached. Everything is kept in
+CacheStore entries so budgets carry over between runs; the history belongs in
+a store that never evicts it, the count cache may go in one that does.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Iterable, Optional
+
+from .cache import CacheStore
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_WINDOW = 200_000  # Prompt plus output, in tokens
+DEFAULT_CHARS_PER_TOKEN = 4.0  # Until real usage has been observed
+
+
+def _prompt_text(params: dict) -> str:
+    """All the text a request sends: system blocks and message contents."""
+    parts = []
+    system = params.get("system") or []
+    for block in [system] if isinstance(system, str) else system:
+        parts.append(block if isinstance(block, str) else block.get("text", ""))
+    for message in params.get("messages", []):
+        content = message["content"]
+        parts.append(content if isinstance(content, str) else json.dumps(content))
+    return "".join(parts)
+
+
+class TokenBudget:
+    """
+    Per-label output size history (labels are level keys, plus "skeleton"
+    for the title/theme/hooks) and prompt token counts.
+
+    max_tokens() sums the `fraction` quantile of each label's recent sizes,
+    adds `headroom`, and keeps the result between `floor` and `ceiling`,
+    under the model's output cap and inside the context window. Labels
+    without enough history fall back to the caller's default. A label whose
+    response was cut off has its estimate multiplied by `growth` (up to
+    `max_boost`); the boost decays by `decay` with each complete sample.
+    """
+
+    def __init__(
+        self,
+        store: CacheStore,
+        key: str = "token-budget",
+        window: int = 50,
+        fraction: float = 0.9,
+        headroom: float = 1.25,
+        floor: int = 1024,
+        ceiling: int = 64000,
+        min_samples: int = 3,
+        growth: float = 1.5,
+        max_boost: float = 4.0,
+        decay: float = 0.9,
+        counts: Optional[CacheStore] = None,
+    ):
+        self.store = store
+        self.counts = counts if counts is not None else store  # Cached count_tokens answers
+        self.key = key
+        self.window = window
+        self.fraction = fraction
+        self.headroom = headroom
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self.growth = growth
+        self.max_boost = max_boost
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._remote_failed = False
+        state = self.store.get_json(key) or {}
+        self.outputs: dict[str, list[int]] = state.get("outputs", {})
+        self.boosts: dict[str, float] = state.get("boosts", {})  # Labels recently cut off at max_tokens
+        self.output_chars: int = state.get("output_chars", 0)
+        self.output_tokens: int = state.get("output_tokens", 0)
+
+    @property
+    def chars_per_token(self) -> float:
+        if self.output_tokens:
+            return self.output_chars / self.output_tokens
+        return DEFAULT_CHARS_PER_TOKEN
+
+    def estimate(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token) + 1
+
+    def observe(self, text: str, output_tokens: Optional[int]) -> None:
+        """Calibrate chars-per-token from a response and its reported output tokens."""
+        if not output_tokens or not text:
+            return
+        with self._lock:
+            self.output_chars += len(text)
+            self.output_tokens += output_tokens
+
+    def record(self, label: str, value: Any) -> None:
+        """Remember the output size of one part of a response, as the model would write it."""
+        tokens = self.estimate(json.dumps(value, indent=2))
+        with self._lock:
+            samples = self.outputs.setdefault(label, [])
+            samples.append(tokens)
+            del samples[:-self.window]
+            if label in self.boosts:
+                self.boosts[label] *= self.decay
+                if self.boosts[label] <= 1.0:
+                    del self.boosts[label]
+
+    def truncated(self, labels: Iterable[str]) -> None:
+        """A response made of `labels` stopped at max_tokens: plan more for them next time."""
+        with self._lock:
+            for label in labels:
+                self.boosts[label] = min(self.max_boost, self.boosts.get(label, 1.0) * self.growth)
+
+    def expected(self, label: str) -> Optional[int]:
+        """
+        The `fraction` quantile of a label's recent output sizes, raised if it
+        was recently cut off, or None with too little history.
+        """
+        with self._lock:
+            samples = sorted(self.outputs.get(label, []))
+            boost = self.boosts.get(label, 1.0)
+        if len(samples) < self.min_samples:
+            return None
+        return int(samples[min(len(samples) - 1, int(self.fraction * len(samples)))] * boost)
+
+    def max_tokens(
+        self,
+        labels: Iterable[str],
+        default: int,
+        prompt_tokens: int = 0,
+        floor: Optional[int] = None,
+        cap: Optional[int] = None,
+    ) -> int:
+        """
+        Output budget for a response made of `labels`, given its prompt size.
+        `floor` replaces the configured floor; `cap` is the model's output limit.
+        """
+        expected = [self.expected(label) for label in labels]
+        if None in expected:
+            budget = default
+        else:
+            floor = self.floor if floor is None else floor
+            budget = min(self.ceiling, max(floor, int(sum(expected) * self.headroom)))
+        if cap is not None:
+            budget = min(budget, cap)
+        return max(1, min(budget, CONTEXT_WINDOW - prompt_tokens))
+
+    def count_prompt(self, params: dict, client: Any = None) -> int:
+        """
+        Input tokens of a request. With a client, asks its count_tokens
+        endpoint (once per distinct prompt; answers are cached) and falls back
+        to the local estimate if that isn't available.
+        """
+        if client is None or self._remote_failed:
+            return self.estimate(_prompt_text(params))
+
+        relevant = {name: params.get(name) for name in ("model", "system", "messages")}
+        cache_key = "token-count-" + hashlib.sha256(json.dumps(relevant, sort_keys=True).encode()).hexdigest()[:32]
+        cached = self.counts.get_json(cache_key)
+        if cached is not None:
+            return cached["input_tokens"]
+        try:
+            input_tokens = client.messages.count_tokens(**relevant).input_tokens
+        except Exception as e:
+            # Replay/recording clients and some endpoints don't have it - count locally from now on
+            logger.warning(f"count_tokens unavailable ({e.__class__.__name__}), estimating prompt sizes locally")
+            self._remote_failed = True
+            return self.estimate(_prompt_text(params))
+        self.counts.put_json(cache_key, {"input_tokens": input_tokens})
+        return input_tokens
+
+    def save(self) -> None:
+        with self._lock:
+            self.store.put_json(self.key, {
+                "outputs": self.outputs,
+                "output_chars": self.output_chars,
+                "output_tokens": self.output_tokens,
+                "boosts": self.boosts,
+            })